@@ -1,16 +1,39 @@
 import os
 import json
 import time
-import streamlit as st
-import requests
-from openai import OpenAI
+import asyncio
+import random
+import threading
+from collections import Counter
+from itertools import islice
 from dotenv import load_dotenv
 
+# Load .env before the modules below read their config from the environment
+load_dotenv()
+
+from async_runtime import UIRelay
+from http_client import async_threelook_client, build_templates_url, next_cursor, threelook_client
+from caches import LRUTTLCache, StaleWhileRevalidateCache
+from singleflight import SingleFlight
+from rate_limit import AdaptiveRateLimiter, current_session
+from llm_cache import CompletionCache
+from prerank import rank_locally, shortlist_gifs
+from ranking_stream import RankingStreamParser
+from prompt_encoding import CandidateEncoder
+from tag_vocabulary import TagVocabulary
+from catalog import CatalogSyncer, TemplateCatalog
+from previews import PreviewCache
+from result_cache import NearDuplicateCache
+from templates import TemplateStore, parse_templates
+from text_utils import estimate_tokens
+from tracing import current_span, render_span_tree, span, start_metrics_server, traced, tracer
+
 # Load OpenAI API key from environment variables or Streamlit secrets
 def get_openai_api_key():
     """Get OpenAI API key from environment variables or Streamlit secrets."""
-    # First try to load from .env file
-    load_dotenv()
+    import streamlit as st
+
+    # First try the environment (.env is loaded at import)
     api_key = os.getenv("OPENAI_API_KEY")
     
     # If found in .env, return it
@@ -29,25 +52,289 @@ def get_openai_api_key():
         st.stop()
         return None
 
-# Initialize OpenAI client
-client = OpenAI(api_key=get_openai_api_key())
+# The OpenAI client is built on first use, not at import: the openai package is
+# slow to import and the key lookup may need Streamlit secrets
+_openai_client = None
+_openai_client_lock = threading.Lock()
+
+def get_openai_client():
+    """Return the process-wide AsyncOpenAI client, creating it on first call.
+
+    Call it from the Streamlit script thread first, so a missing key can be
+    reported in the page; the client itself is only used from the shared
+    pipeline event loop.
+    """
+    global _openai_client
+    with _openai_client_lock:
+        if _openai_client is None:
+            from openai import AsyncOpenAI
+            # Retries go through openai_limiter instead of the SDK, so 429s slow every session down
+            _openai_client = AsyncOpenAI(api_key=get_openai_api_key(), max_retries=0)
+        return _openai_client
+
+# Completions are cached on disk so identical prompts survive restarts
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "llm_cache.sqlite3"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+completion_cache = CompletionCache(LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES, max_bytes=LLM_CACHE_MAX_BYTES)
+
+# Identical upstream calls made at the same time by different sessions share one
+# in-flight request
+llm_flight = SingleFlight()
+trending_flight = SingleFlight()
+search_flight = SingleFlight()
+
+async def request_completion(kwargs: dict, on_delta=None, llm_span=None) -> tuple:
+    """Call the chat completions API, streaming to on_delta if given. Returns (content, usage)."""
+    usage = None
+    if on_delta is None:
+        response = await get_openai_client().chat.completions.create(**kwargs)
+        return response.choices[0].message.content, response.usage
+
+    parts = []
+    stream = await get_openai_client().chat.completions.create(stream=True, stream_options={"include_usage": True}, **kwargs)
+    async for chunk in stream:
+        # The final chunk carries token usage and no choices
+        if getattr(chunk, "usage", None) is not None:
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            if not parts and llm_span is not None:
+                llm_span.set(first_token=f"{llm_span.duration:.2f}s")
+            parts.append(delta)
+            on_delta(delta)
+    return "".join(parts), usage
+
+# Client-side OpenAI limits shared by every session in the process; requests
+# over the limits queue, served round-robin across sessions
+OPENAI_RPM_LIMIT = float(os.getenv("OPENAI_RPM_LIMIT", "500"))
+OPENAI_TPM_LIMIT = float(os.getenv("OPENAI_TPM_LIMIT", "200000"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
+OPENAI_MAX_ATTEMPTS = int(os.getenv("OPENAI_MAX_ATTEMPTS", "4"))
+# Completion tokens assumed for a request until its real usage is known
+OPENAI_COMPLETION_TOKEN_ESTIMATE = 200
+openai_limiter = AdaptiveRateLimiter(OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT, OPENAI_MAX_CONCURRENCY)
+
+def classify_openai_error(error: Exception) -> tuple:
+    """Return (retryable, retry_after) for an OpenAI client error; retry_after is only set for a 429."""
+    from openai import APIConnectionError, APIStatusError
+    if isinstance(error, APIStatusError):
+        if error.status_code == 429:
+            try:
+                return True, float(error.response.headers.get("retry-after", "1"))
+            except ValueError:
+                return True, 1.0
+        return error.status_code >= 500, None
+    return isinstance(error, APIConnectionError), None
+
+async def limited_completion(kwargs: dict, on_delta=None, llm_span=None) -> tuple:
+    """request_completion behind openai_limiter, retrying 429s, 5xx and connection errors."""
+    estimated_tokens = estimate_tokens(json.dumps(kwargs["messages"])) + OPENAI_COMPLETION_TOKEN_ESTIMATE
+    streamed = False
+
+    def forward(delta):
+        nonlocal streamed
+        streamed = True
+        on_delta(delta)
+
+    queue_wait = 0.0
+    for attempt in range(1, OPENAI_MAX_ATTEMPTS + 1):
+        with span("llm.queue"):
+            permit = await openai_limiter.acquire(estimated_tokens)
+        queue_wait += permit.wait
+        if llm_span is not None:
+            llm_span.set(queue_wait=f"{queue_wait:.2f}s", attempts=attempt)
+        try:
+            content, usage = await request_completion(kwargs, forward if on_delta is not None else None, llm_span)
+        except Exception as e:
+            retryable, retry_after = classify_openai_error(e)
+            openai_limiter.release(permit, "rate_limited" if retry_after is not None else "error", retry_after=retry_after)
+            # Text already handed to on_delta can't be taken back, so a broken stream isn't retried
+            if not retryable or streamed or attempt == OPENAI_MAX_ATTEMPTS:
+                raise
+            if retry_after is None:
+                await asyncio.sleep(random.uniform(0, min(0.5 * 2 ** attempt, 8)))
+            continue
+        except BaseException:
+            openai_limiter.release(permit, "error")
+            raise
+        openai_limiter.release(permit, used_tokens=usage.total_tokens if usage is not None else None)
+        return content, usage
+
+@traced("llm.chat")
+async def create_chat_completion(messages: list, response_format: dict = None, model: str = "gpt-4o-mini",
+                                 bypass_cache: bool = False, on_delta=None) -> tuple:
+    """Run a chat completion through the on-disk completion cache.
+
+    Returns the message content and whether it came from the cache. With
+    bypass_cache the API is always called and the fresh result replaces the
+    cached one. JSON responses are only cached when they parse.
+
+    If on_delta is given the response is streamed and on_delta is called with
+    each new piece of text as it arrives (a cached response arrives in one piece).
+    Concurrent identical requests share one API call; callers that joined
+    another caller's call also get the whole text in one piece.
+    """
+    llm_span = current_span()
+    llm_span.set(model=model, streamed=on_delta is not None)
+    key = CompletionCache.make_key(model, messages, response_format)
+    if not bypass_cache:
+        content = completion_cache.get(key)
+        if content is not None:
+            llm_span.set(cached=True)
+            if on_delta is not None:
+                on_delta(content)
+            return content, True
+
+    kwargs = {"model": model, "messages": messages}
+    if response_format is not None:
+        kwargs["response_format"] = response_format
+    (content, usage), shared = await llm_flight.do_async(
+        key, lambda: limited_completion(kwargs, on_delta, llm_span)
+    )
+    llm_span.set(cached=False)
+    if shared:
+        # The caller that started the request records usage and fills the cache
+        llm_span.set(coalesced=True)
+        if on_delta is not None and content:
+            on_delta(content)
+        return content, False
+    if usage is not None:
+        llm_span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+
+    if content is not None:
+        try:
+            if response_format and response_format.get("type") == "json_object":
+                json.loads(content)
+            completion_cache.set(key, model, content)
+        except json.JSONDecodeError:
+            pass
+    return content, False
+
+# Local template catalog, kept in sync in the background and used for keyword
+# lookups instead of live search while it is fresh
+CATALOG_ENABLED = os.getenv("CATALOG_ENABLED", "1") == "1"
+CATALOG_PATH = os.getenv("CATALOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "catalog.sqlite3"))
+CATALOG_SYNC_INTERVAL = float(os.getenv("CATALOG_SYNC_INTERVAL", "1800"))
+CATALOG_MAX_AGE = float(os.getenv("CATALOG_MAX_AGE", "21600"))
+template_catalog = TemplateCatalog(CATALOG_PATH, max_age=CATALOG_MAX_AGE) if CATALOG_ENABLED else None
+catalog_syncer = CatalogSyncer(template_catalog, interval=CATALOG_SYNC_INTERVAL) if CATALOG_ENABLED else None
+
+def start_catalog_sync(base_url: str, headers: dict):
+    """Start the background catalog sync job once per process."""
+    if catalog_syncer is not None:
+        catalog_syncer.start(base_url, headers)
+
+# Optional trace export: every finished pipeline trace appended as a JSON line,
+# and per-stage latency histograms served over HTTP for scraping (localhost only
+# unless METRICS_HOST says otherwise, e.g. 0.0.0.0 for an external scraper)
+tracer.jsonl_path = os.getenv("TRACE_JSONL_PATH") or None
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+def start_metrics_export():
+    """Start the /metrics endpoint once per process if METRICS_PORT is set."""
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT, METRICS_HOST)
+
+# Downscaled previews for the result cards, made on a worker pool and served by
+# Streamlit's static file serving from static/previews next to the app
+PREVIEWS_ENABLED = os.getenv("PREVIEWS_ENABLED", "1") == "1"
+PREVIEW_WIDTHS = tuple(int(width) for width in os.getenv("PREVIEW_WIDTHS", "240,480").split(","))
+PREVIEW_CACHE_MAX_BYTES = int(os.getenv("PREVIEW_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+PREVIEW_WORKERS = int(os.getenv("PREVIEW_WORKERS", "4"))
+preview_cache = PreviewCache(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "previews"),
+    url_prefix="app/static/previews",
+    fetch=threelook_client.get,
+    widths=PREVIEW_WIDTHS,
+    max_bytes=PREVIEW_CACHE_MAX_BYTES,
+    workers=PREVIEW_WORKERS,
+) if PREVIEWS_ENABLED else None
+
+# Number of candidates the local BM25 pre-ranker keeps for the LLM ranking call
+PRERANK_TOP_N = int(os.getenv("PRERANK_TOP_N", "60"))
+
+# Trending tags are counted over the trending pool as it is loaded and refreshed;
+# only the most frequent ones go into the keyword prompt
+TRENDING_TAGS_TOP_K = int(os.getenv("TRENDING_TAGS_TOP_K", "40"))
+TRENDING_TAGS_TOKEN_BUDGET = int(os.getenv("TRENDING_TAGS_TOKEN_BUDGET", "200"))
+trending_vocabulary = TagVocabulary()
+
+# Per-candidate tag budget in the compact ranking prompt
+RANK_PROMPT_MAX_TAGS = int(os.getenv("RANK_PROMPT_MAX_TAGS", "8"))
+RANK_PROMPT_MAX_TAG_TOKENS = int(os.getenv("RANK_PROMPT_MAX_TAG_TOKENS", "24"))
+
+# Live keyword searches are bounded process-wide so concurrent sessions can't
+# open an unbounded number of requests against 3look
+SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", "8"))
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "10"))
+search_semaphore = asyncio.Semaphore(SEARCH_MAX_CONCURRENCY)
 
-def extract_keywords(tweet_text: str, trending_tags: list, process_display) -> list:
+# End-to-end budget for one pipeline run; whatever is ready when it runs out is
+# ranked locally instead of waiting on the remaining calls
+PIPELINE_DEADLINE = float(os.getenv("PIPELINE_DEADLINE", "60"))
+
+# The LLM ranking gets at most this long; past it, or when it fails or returns
+# nothing usable, the local ranking (relevance plus NFT popularity) is served
+RANKING_BUDGET = float(os.getenv("RANKING_BUDGET", "8"))
+LOCAL_RANK_POPULARITY_WEIGHT = float(os.getenv("LOCAL_RANK_POPULARITY_WEIGHT", "0.1"))
+# Which path served each ranking, across the whole process
+ranking_paths = Counter()
+
+# Trending templates are shared by every session; stale pages are served while
+# a background refresh reloads them
+TRENDING_CACHE_TTL = float(os.getenv("TRENDING_CACHE_TTL", "3600"))
+trending_cache = StaleWhileRevalidateCache(ttl=TRENDING_CACHE_TTL)
+
+# Whole pipeline results per tweet, also served for near-identical tweets
+# (retweets, quotes, small edits). They expire with the trending data by default
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", str(TRENDING_CACHE_TTL)))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1000"))
+RESULT_CACHE_MAX_DISTANCE = int(os.getenv("RESULT_CACHE_MAX_DISTANCE", "6"))
+result_cache = NearDuplicateCache(ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES,
+                                  max_distance=RESULT_CACHE_MAX_DISTANCE)
+
+# How deep into trending the pipeline reads, and how long it may spend paging
+TRENDING_PAGE_SIZE = 25
+TRENDING_POOL_SIZE = int(os.getenv("TRENDING_POOL_SIZE", "25"))
+TRENDING_MAX_LATENCY = float(os.getenv("TRENDING_MAX_LATENCY", "3"))
+
+# Every parsed template goes through one process-wide store, so sessions and
+# caches share a single record per template and sessions keep only IDs
+TEMPLATE_STORE_MAX_ENTRIES = int(os.getenv("TEMPLATE_STORE_MAX_ENTRIES", "20000"))
+template_store = TemplateStore(max_entries=TEMPLATE_STORE_MAX_ENTRIES)
+
+# Keyword search results are shared by every session, bounded by entry count
+# and by the approximate size of the cached template records
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "900"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2000"))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+search_cache = LRUTTLCache(
+    ttl=SEARCH_CACHE_TTL,
+    max_entries=SEARCH_CACHE_MAX_ENTRIES,
+    max_bytes=SEARCH_CACHE_MAX_BYTES,
+    sizeof=lambda templates: sum(template.approx_size() for template in templates),
+)
+
+@traced("keywords")
+async def extract_keywords(tweet_text: str, trending_tags: list, process_display, bypass_cache: bool = False) -> list:
     """Extract keywords from a tweet using GPT-4o-mini, informed by trending tags."""
-    start_time = time.time()
     process_display.markdown("""
     ```
     ᐅ Analyzing tweet content...
     ```
     """)
     
-    # Don't limit trending tags
+    # Trending tags arrive most frequent first and already trimmed to the prompt budget
     prompt = f"""Analyze this tweet and extract exactly 3 keywords or phrases that would help find the most viral, relatable GIFs that Gen Z and young millennials would love:
 
     Tweet: "{tweet_text}"
 
-    Here are popular tags from trending GIFs that might be relevant:
-    {trending_tags}
+    Here are popular tags from trending GIFs that might be relevant, most popular first:
+    {", ".join(trending_tags)}
 
     Return a JSON object with this format:
     {{
@@ -64,26 +351,26 @@ def extract_keywords(tweet_text: str, trending_tags: list, process_display) -> l
     7. Preferably include or relate to some of the trending tags when they align with current meme culture
     """
     
-    llm_start = time.time()
-    response = client.chat.completions.create(
+    content, cached = await create_chat_completion(
         model="gpt-4o-mini",
         response_format={"type": "json_object"},
         messages=[
             {"role": "system", "content": "You are an expert at internet culture, viral content, and Gen Z humor. You understand what makes content shareable and relatable to younger audiences."},
             {"role": "user", "content": prompt}
-        ]
+        ],
+        bypass_cache=bypass_cache
     )
-    llm_time = time.time() - llm_start
     
     try:
-        result = json.loads(response.choices[0].message.content)
+        result = json.loads(content)
         keywords = result.get("keywords", [])
-    except (json.JSONDecodeError, AttributeError):
+    except (json.JSONDecodeError, AttributeError, TypeError):
         process_display.markdown("""
         ```
         ᐅ Error parsing response. Please try again.
         ```
         """)
+        current_span().set(outcome="parse error")
         return []
     
     if not keywords:
@@ -92,6 +379,7 @@ def extract_keywords(tweet_text: str, trending_tags: list, process_display) -> l
         ᐅ No keywords found. Please try again later.
         ```
         """)
+        current_span().set(outcome="no keywords")
         return []
     
     process_display.markdown("""
@@ -102,49 +390,234 @@ def extract_keywords(tweet_text: str, trending_tags: list, process_display) -> l
     ```
     """.format(", ".join(keywords)))
     
-    total_time = time.time() - start_time
-    return keywords, f"Keyword extraction: {total_time:.2f}s (LLM: {llm_time:.2f}s)\n"
+    current_span().set(keywords=len(keywords))
+    return keywords
 
-def extract_trending_tags(gifs: list) -> list:
-    """Extract unique tags from a list of GIFs."""
-    all_tags = []
-    for gif in gifs:
-        tags = gif.get("tags", [])
-        all_tags.extend(tags)
-    
-    # Return unique tags
-    return list(set(all_tags))
+@traced("tags")
+def extract_trending_tags(k: int = None, token_budget: int = None) -> list:
+    """Return the top tags of the shared trending tag index.
+
+    Tags come back most frequent first, capped at k tags and token_budget
+    prompt tokens, so the prompt stays small and stable as the trending pool grows.
+    The index itself is updated whenever trending templates are loaded.
+    """
+    tags = trending_vocabulary.top_tags(k or TRENDING_TAGS_TOP_K, token_budget or TRENDING_TAGS_TOKEN_BUDGET)
+    current_span().set(selected=len(tags), vocabulary=len(trending_vocabulary))
+    return tags
+
+def normalize_keyword(keyword: str) -> str:
+    """Normalize a keyword so "Mood", " mood " and "'mood'" share one search."""
+    keyword = " ".join(keyword.split()).lower()
+    return keyword.strip("'\"`\u2018\u2019\u201c\u201d ")
 
-def search_gifs(keyword: str, base_url: str, headers: dict, process_display) -> list:
-    """Search GIFs using a specific keyword."""
+async def fetch_search_results(keyword: str, base_url: str, headers: dict) -> list:
+    """Run a live keyword search against 3look and cache the Template results, raising on any failure."""
+    async with search_semaphore:
+        response = await async_threelook_client.get(build_templates_url(base_url, query=keyword), headers=headers)
+    response.raise_for_status()
+    results = template_store.add(parse_templates(response.json().get("templates", [])))
+    search_cache.set((base_url, keyword), results)
+    return results
+
+@traced("search.keyword")
+async def search_gifs(keyword: str, base_url: str, headers: dict, process_display) -> list:
+    """Search GIFs using a specific keyword, served from the shared search cache when possible."""
     start_time = time.time()
-    url = f"{base_url}?cursor=&filters=query:'{keyword}',types:gif&widget=tensorians&excluded_categories[]=305e1658-f986-4879-b927-484fa945ed23&excluded_categories[]=738e63e4-d126-4c58-8d08-17d06672dee1&take=25&is_trending=false"
-    try:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            results = response.json().get("templates", [])
-            process_display.markdown(f"   Found {len(results)} GIFs for keyword '{keyword}' in {time.time() - start_time:.2f}s")
+    keyword = normalize_keyword(keyword)
+    search_span = current_span()
+    search_span.set(keyword=keyword)
+    cached = search_cache.get((base_url, keyword))
+    if cached is not None:
+        search_span.set(source="cache", results=len(cached))
+        if process_display is not None:
+            process_display.markdown(f"   Found {len(cached)} cached GIFs for keyword '{keyword}'")
+        return cached, time.time() - start_time
+
+    # Serve from the local catalog while it is fresh; live search covers a cold or stale catalog.
+    # Quoted FTS terms must all match, so no rows isn't authoritative and falls through to live search too
+    if template_catalog is not None and template_catalog.is_fresh():
+        try:
+            results = template_catalog.search(keyword)
+        except Exception:
+            results = None
+        if results:
+            results = template_store.add(results)
+            search_span.set(source="catalog", results=len(results))
+            search_cache.set((base_url, keyword), results)
+            if process_display is not None:
+                process_display.markdown(f"   Found {len(results)} GIFs for keyword '{keyword}' in the local catalog")
             return results, time.time() - start_time
+
+    try:
+        results, shared = await search_flight.do_async(
+            (base_url, keyword), lambda: fetch_search_results(keyword, base_url, headers)
+        )
+    except Exception as e:
+        search_span.set(source="live", error=type(e).__name__)
         return [], time.time() - start_time
-    except Exception:
-        return [], time.time() - start_time
+    search_span.set(source="live", results=len(results), coalesced=shared)
+    if process_display is not None:
+        process_display.markdown(f"   Found {len(results)} GIFs for keyword '{keyword}' in {time.time() - start_time:.2f}s")
+    return results, time.time() - start_time
 
-def get_trending_gifs(page: int, base_url: str, headers: dict, process_display) -> list:
-    """Get a page of trending GIFs."""
+@traced("search")
+async def search_keywords_concurrently(keywords: list, base_url: str, headers: dict, process_display, timeout: float = SEARCH_TIMEOUT) -> tuple:
+    """Search all keywords at once and merge the results in keyword order.
+
+    Returns the merged GIF list and a list of (keyword, seconds, status) tuples,
+    where status is "ok", "failed" or "timed out". A failed or slow keyword only
+    drops its own results.
+    """
     start_time = time.time()
-    url = f"{base_url}?cursor=&filters=types:gif&widget=tensorians&excluded_categories[]=305e1658-f986-4879-b927-484fa945ed23&excluded_categories[]=738e63e4-d126-4c58-8d08-17d06672dee1&take=25&is_trending=true"
+    tasks = {
+        asyncio.ensure_future(search_gifs(keyword, base_url, headers, None)): keyword
+        for keyword in keywords
+    }
+    done = set()
+    if tasks:
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+    results_by_keyword = {}
+    keyword_timings = []
+    # Report in keyword order so the merged list and timing output are deterministic
+    for task, keyword in tasks.items():
+        if task not in done:
+            keyword_timings.append((keyword, time.time() - start_time, "timed out"))
+            process_display.markdown(f"   Search for keyword '{keyword}' timed out after {timeout:g}s")
+            continue
+        try:
+            keyword_gifs, keyword_time = task.result()
+        except Exception:
+            keyword_timings.append((keyword, time.time() - start_time, "failed"))
+            process_display.markdown(f"   Search for keyword '{keyword}' failed")
+            continue
+        results_by_keyword[keyword] = keyword_gifs
+        keyword_timings.append((keyword, keyword_time, "ok"))
+        process_display.markdown(f"   Found {len(keyword_gifs)} GIFs for keyword '{keyword}' in {keyword_time:.2f}s")
+
+    all_gifs = []
+    for keyword in keywords:
+        all_gifs.extend(results_by_keyword.get(keyword, []))
+    current_span().set(keywords=len(keywords), ok=len(results_by_keyword), gifs=len(all_gifs))
+    return all_gifs, keyword_timings
+
+def iter_trending_gifs(base_url: str, headers: dict, page_size: int = TRENDING_PAGE_SIZE,
+                       max_items: int = None, max_latency: float = None):
+    """Yield trending GIFs as Template records one at a time, following the API cursor lazily.
+
+    The next page is only requested once the consumer has used up the current
+    one, so stopping early (or hitting max_items) never fetches pages that
+    won't be used. No new page is requested after max_latency seconds.
+    """
+    start_time = time.time()
+    cursor = ""
+    yielded = 0
+    while True:
+        response = threelook_client.get(
+            build_templates_url(base_url, cursor=cursor, trending=True, take=page_size), headers=headers
+        )
+        response.raise_for_status()
+        payload = response.json()
+        templates = template_store.add(parse_templates(payload.get("templates", [])))
+        for template in templates:
+            yield template
+            yielded += 1
+            if max_items is not None and yielded >= max_items:
+                return
+        cursor = next_cursor(payload)
+        if not cursor or len(templates) < page_size:
+            return
+        if max_latency is not None and time.time() - start_time >= max_latency:
+            return
+
+def fetch_trending_gifs(page: int, base_url: str, headers: dict, max_items: int = None,
+                        max_latency: float = None) -> list:
+    """Fetch trending GIFs from 3look starting at a page, raising on any failure.
+
+    Returns one page by default, or up to max_items GIFs across as many pages
+    as needed. Pages are max_items long, so page 1 follows on from page 0.
+    """
+    max_items = max_items or TRENDING_PAGE_SIZE
+    start = page * max_items
+    gifs = iter_trending_gifs(base_url, headers, max_items=start + max_items, max_latency=max_latency)
+    return list(islice(gifs, start, start + max_items))
+
+def load_trending_gifs(page: int, base_url: str, headers: dict, max_items: int) -> list:
+    """Cache loader for trending GIFs; sessions loading the same page at once share one fetch."""
+    results, shared = trending_flight.do(
+        (base_url, page, max_items),
+        lambda: fetch_trending_gifs(page, base_url, headers, max_items, TRENDING_MAX_LATENCY),
+    )
+    # Fresh trending data, including background refreshes, replaces the pool in the tag index
+    trending_vocabulary.update(results)
+    trending_span = current_span()
+    if shared and trending_span is not None:
+        trending_span.set(coalesced=True)
+    return results
+
+def prefetch_trending_gifs(base_url: str, headers: dict, page: int = 0, max_items: int = None):
+    """Warm the trending cache in the background so the first Analyze click doesn't pay for it."""
+    max_items = max_items or TRENDING_POOL_SIZE
+    trending_cache.prefetch(
+        (base_url, page, max_items),
+        lambda: load_trending_gifs(page, base_url, headers, max_items),
+    )
+
+@traced("trending")
+def get_trending_gifs(page: int, base_url: str, headers: dict, process_display, max_items: int = None) -> list:
+    """Get trending GIFs starting at a page, served from the shared trending cache.
+
+    max_items defaults to the configured trending pool size.
+    """
+    start_time = time.time()
+    max_items = max_items or TRENDING_POOL_SIZE
     try:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            results = response.json().get("templates", [])
-            process_display.markdown(f"   Found {len(results)} trending GIFs in {time.time() - start_time:.2f}s")
-            return results, time.time() - start_time
-        return [], time.time() - start_time
-    except Exception:
+        results, status = trending_cache.get(
+            (base_url, page, max_items),
+            lambda: load_trending_gifs(page, base_url, headers, max_items),
+        )
+    except Exception as e:
+        current_span().set(error=type(e).__name__)
         return [], time.time() - start_time
+    current_span().set(cache=status, gifs=len(results))
+    source = "from the network" if status == "miss" else "from cache"
+    process_display.markdown(f"   Found {len(results)} trending GIFs {source} in {time.time() - start_time:.2f}s")
+    return results, time.time() - start_time
 
-def rank_gifs(tweet_text: str, gifs: list, process_display) -> list:
-    start_time = time.time()
+def build_gif_prompt_data(gifs: list) -> list:
+    """Prepare GIF data for the ranking prompt - include all tags."""
+    return [
+        {
+            "id": gif.id,
+            "name": gif.name,
+            "tags": gif.tags,
+        }
+        for gif in gifs
+    ]
+
+@traced("prerank")
+def prerank_gifs(tweet_text: str, keywords: list, gifs: list, top_n: int = PRERANK_TOP_N) -> list:
+    """Shortlist candidates locally with BM25 before the LLM ranking call.
+
+    Records the estimated prompt token reduction on the current span.
+    """
+    shortlist = shortlist_gifs(tweet_text, keywords, gifs, max(top_n, 24))
+    tokens_before = estimate_tokens(json.dumps(build_gif_prompt_data(gifs)))
+    tokens_after = estimate_tokens(json.dumps(build_gif_prompt_data(shortlist)))
+    current_span().set(gifs_in=len(gifs), gifs_out=len(shortlist),
+                       prompt_tokens_before=tokens_before, prompt_tokens_after=tokens_after)
+    return shortlist
+
+@traced("ranking")
+async def rank_gifs(tweet_text: str, gifs: list, process_display, bypass_cache: bool = False, on_ranked=None) -> list:
+    """Rank GIFs with GPT-4o-mini.
+
+    If on_ranked is given the response is streamed, and on_ranked(gif, position)
+    is called for each ranked GIF as soon as its ID has been generated.
+    """
+    ranking_span = current_span()
     process_display.markdown("""
     ```
     ᐅ Found {} total GIFs to analyze
@@ -153,32 +626,25 @@ def rank_gifs(tweet_text: str, gifs: list, process_display) -> list:
     ```
     """.format(len(gifs)))
     
-    # Don't limit the number of GIFs
-    
-    # Prepare GIF data for the prompt - include all fields
-    gif_data = [
-        {
-            "id": gif["id"],
-            "name": gif["name"],
-            "tags": gif.get("tags", []),  # Include all tags
-        }
-        for gif in gifs
-    ]
+    # Candidates are already shortlisted by the pre-ranker; send all of them under
+    # short numeric aliases with trimmed tags instead of UUIDs and full tag lists
+    encoder = CandidateEncoder(gifs, max_tags=RANK_PROMPT_MAX_TAGS, max_tag_tokens=RANK_PROMPT_MAX_TAG_TOKENS)
+    token_report = encoder.token_report()
+    ranking_span.set(
+        candidates=len(gifs),
+        prompt_tokens=f"~{token_report['prompt_before']} -> ~{token_report['prompt_after']}",
+        completion_tokens=f"~{token_report['completion_before']} -> ~{token_report['completion_after']}",
+    )
     
     prompt = f"""Given this tweet and list of GIFs, rank EXACTLY 24 GIFs that would make the most viral, shareable, and relatable response that Gen Z and young millennials would love.
 
     Tweet: "{tweet_text}"
 
-    Available GIFs: {json.dumps(gif_data)}
+    Available GIFs, each as [number, name, tags]: {encoder.encode()}
 
-    Return a JSON object with EXACTLY this format:
+    Return a JSON object with EXACTLY this format, listing GIF numbers best first:
     {{
-        "rankings": [
-            {{"id": "gif_id_1"}},
-            {{"id": "gif_id_2"}},
-            {{"id": "gif_id_3"}},
-            ... and so on until you have EXACTLY 24 GIFs
-        ]
+        "rankings": [number1, number2, number3, ... and so on until you have EXACTLY 24 GIFs]
     }}
 
     When ranking, prioritize GIFs that:
@@ -196,20 +662,35 @@ def rank_gifs(tweet_text: str, gifs: list, process_display) -> list:
     IMPORTANT: You MUST return EXACTLY 24 GIFs in your rankings. If there aren't enough perfect matches, include the next best options to reach exactly 24. This is critical for the application to function correctly.
     """
     
-    llm_start = time.time()
-    response = client.chat.completions.create(
+    # When streaming, hand each new valid ID to the UI as soon as it is complete
+    on_delta = None
+    if on_ranked is not None:
+        gifs_by_id = {gif.id: gif for gif in gifs}
+        parser = RankingStreamParser()
+        streamed = []
+        
+        def on_delta(text):
+            for gif_id in encoder.decode(parser.feed(text)):
+                if gif_id in gifs_by_id and gif_id not in streamed and len(streamed) < 24:
+                    if not streamed:
+                        ranking_span.set(first_gif=f"{ranking_span.duration:.2f}s")
+                    on_ranked(gifs_by_id[gif_id], len(streamed))
+                    streamed.append(gif_id)
+    
+    content, cached = await create_chat_completion(
         model="gpt-4o-mini",
         response_format={"type": "json_object"},
         messages=[
-            {"role": "system", "content": "You are an expert on internet culture, viral content, and Gen Z humor. You understand exactly what makes GIFs shareable and relatable to younger audiences. You ALWAYS return EXACTLY 24 GIFs in your rankings as requested. Return ONLY the exact JSON format requested."},
+            {"role": "system", "content": "You are an expert on internet culture, viral content, and Gen Z humor. You understand exactly what makes GIFs shareable and relatable to younger audiences. You ALWAYS return EXACTLY 24 GIF numbers in your rankings as requested. Return ONLY the exact JSON format requested."},
             {"role": "user", "content": prompt}
-        ]
+        ],
+        bypass_cache=bypass_cache,
+        on_delta=on_delta
     )
-    llm_time = time.time() - llm_start
     
     try:
-        result = json.loads(response.choices[0].message.content)
-        rankings = result.get("rankings", [])
+        result = json.loads(content)
+        rankings = [{"id": gif_id} for gif_id in encoder.decode(result.get("rankings", []))]
         
         # If we don't have enough rankings, log this issue and pad with additional GIFs if possible
         if len(rankings) < 24 and len(gifs) >= 24:
@@ -223,24 +704,25 @@ def rank_gifs(tweet_text: str, gifs: list, process_display) -> list:
             ranked_ids = {r["id"] for r in rankings}
             
             # Find GIFs that aren't already ranked
-            unranked_gifs = [g for g in gifs if g["id"] not in ranked_ids]
+            unranked_gifs = [g for g in gifs if g.id not in ranked_ids]
             
             # Add additional GIFs until we reach 24 or run out of GIFs
             for i, gif in enumerate(unranked_gifs):
                 if len(rankings) >= 24:
                     break
-                rankings.append({"id": gif["id"]})
+                rankings.append({"id": gif.id})
                 
         # Ensure we only return at most 24 GIFs
         rankings = rankings[:24]
         
-    except (json.JSONDecodeError, AttributeError):
+    except (json.JSONDecodeError, AttributeError, TypeError):
         process_display.markdown("""
         ```
         ᐅ Error parsing response. Please try again.
         ```
         """)
-        return [], f"Ranking GIFs: Error (LLM: {llm_time:.2f}s)\n"
+        ranking_span.set(outcome="parse error")
+        return []
     
     if not rankings:
         process_display.markdown("""
@@ -248,7 +730,8 @@ def rank_gifs(tweet_text: str, gifs: list, process_display) -> list:
         ᐅ No rankings found. Please try again later.
         ```
         """)
-        return [], f"Ranking GIFs: No results (LLM: {llm_time:.2f}s)\n"
+        ranking_span.set(outcome="no rankings")
+        return []
     
     process_display.markdown("""
     ```
@@ -258,56 +741,220 @@ def rank_gifs(tweet_text: str, gifs: list, process_display) -> list:
     ```
     """.format(len(rankings)))
     
-    total_time = time.time() - start_time
-    return rankings, f"Ranking GIFs: {total_time:.2f}s (LLM: {llm_time:.2f}s)\n"
+    ranking_span.set(ranked=len(rankings))
+    return rankings
 
-def process_tweet_and_rank_gifs(tweet_text: str, api_url: str, headers: dict, process_display) -> list:
-    """Process a tweet and rank GIFs based on viral potential using GPT-4o-mini for speed."""
-    timing_info = ""
+def rank_gifs_locally(tweet_text: str, keywords: list, gifs: list) -> list:
+    """Rank GIFs without the LLM, by relevance to the tweet and keywords plus NFT popularity."""
+    ranked = rank_locally(tweet_text, keywords, gifs, 24, popularity_weight=LOCAL_RANK_POPULARITY_WEIGHT)
+    return [{"id": gif.id} for gif in ranked]
+
+def process_stats_report() -> str:
+    """Summarize the process-wide caches, limiters and connection pools for the timing panel."""
+    report = ""
+    # Tweets answered from earlier results
+    result_stats = result_cache.stats()
+    report += (f"Result cache: {result_stats['hits']} hits ({result_stats['near_hits']} near-duplicate), "
+               f"{result_stats['misses']} misses, {result_stats['hit_rate']:.0%} hit rate, "
+               f"{result_stats['entries']} entries\n")
+
+    # How often the LLM ranking made its budget
+    report += f"Ranking served: {ranking_paths['llm']} by LLM, {ranking_paths['local']} locally\n"
+
+    # Shared trending cache effectiveness across the whole process
+    trending_stats = trending_cache.stats()
+    report += (f"Trending cache: {trending_stats['hits']} hits, {trending_stats['stale_hits']} stale, "
+               f"{trending_stats['misses']} misses, {trending_stats['refreshes']} refreshes\n")
+
+    # Shared keyword search cache usage and footprint
+    search_stats = search_cache.stats()
+    report += (f"Search cache: {search_stats['hits']} hits, {search_stats['misses']} misses, "
+               f"{search_stats['entries']} entries (~{search_stats['bytes'] / 1024:.0f} KB)\n")
+
+    # Persistent completion cache usage
+    llm_cache_stats = completion_cache.stats()
+    report += (f"LLM cache: {llm_cache_stats['hits']} hits, {llm_cache_stats['misses']} misses, "
+               f"{llm_cache_stats['entries']} entries\n")
+
+    # OpenAI request scheduling across the whole process
+    limiter_stats = openai_limiter.stats()
+    report += (f"OpenAI limiter: concurrency {limiter_stats['limit']}, {limiter_stats['queued']} queued, "
+               f"{limiter_stats['rate_limited']} rate limited, mean queue wait {limiter_stats['mean_wait']:.2f}s\n")
+
+    # Identical upstream calls shared between concurrent sessions
+    coalesced = []
+    for label, flight in (("trending", trending_flight), ("search", search_flight), ("LLM", llm_flight)):
+        flight_stats = flight.stats()
+        coalesced.append(f"{label} {flight_stats['coalesced']} of {flight_stats['calls'] + flight_stats['coalesced']}")
+    report += f"Coalesced calls: {', '.join(coalesced)}\n"
+
+    # Templates held once for every session
+    store_stats = template_store.stats()
+    report += (f"Template store: {store_stats['templates']} of {store_stats['max_entries']} templates, "
+               f"{store_stats['evictions']} evicted\n")
+
+    # Card previews made so far across the whole process
+    if preview_cache is not None:
+        preview_stats = preview_cache.stats()
+        report += (f"Previews: {preview_stats['sets']} ready (~{preview_stats['bytes'] / 1024 / 1024:.1f} MB), "
+                   f"{preview_stats['pending']} in progress, {preview_stats['failures']} failed\n")
+
+    # Local catalog coverage
+    if template_catalog is not None:
+        catalog_stats = template_catalog.stats()
+        report += (f"Template catalog: {catalog_stats['templates']} templates, "
+                   f"{'fresh' if catalog_stats['fresh'] else 'cold/stale (live search)'}\n")
+
+    # Connection pool usage across the whole process (live searches and background fetches)
+    for label, pool_stats in (("3look connections", async_threelook_client.stats()),
+                              ("3look background connections", threelook_client.stats())):
+        report += (f"{label}: {pool_stats['new_connections']} new, "
+                   f"{pool_stats['reused_connections']} reused, {pool_stats['retries']} retries\n")
+    return report
+
+@traced("pipeline")
+async def process_tweet_and_rank_gifs_async(tweet_text: str, api_url: str, headers: dict, process_display,
+                                            bypass_cache: bool = False, on_ranked=None,
+                                            deadline: float = PIPELINE_DEADLINE, session_id: str = None) -> list:
+    """Async pipeline behind process_tweet_and_rank_gifs.
+
+    Independent I/O overlaps: the trending fetch runs alongside keyword
+    extraction whenever the shared tag index is already warm, and all keyword
+    searches run at once. Each stage only gets what is left of the deadline;
+    when it runs out, the pipeline continues with what it has (down to the
+    trending GIFs alone) and ranks those locally instead of waiting.
+    The LLM ranking is hedged the same way with RANKING_BUDGET, and the
+    local ranking also covers a failed or unparseable LLM response.
+    A cached result for the same or a near-identical tweet skips all of it.
+    Every stage is traced; the timing info is rendered from the span tree.
+    """
+    root = current_span()
+    # OpenAI calls made by this run (and the tasks it starts) queue under this session
+    current_session.set(session_id)
+    pipeline_start = time.time()
+    
+    # A result for the same or a near-identical tweet answers right away
+    if not bypass_cache:
+        with span("result_cache") as cache_span:
+            cached = result_cache.get(tweet_text)
+            cache_span.set(hit=cached is not None)
+        if cached is not None:
+            (ranked_gifs, ranked_templates, keywords), distance = cached
+            root.set(result_cache="exact hit" if distance == 0 else f"near-duplicate hit, {distance} bits apart")
+            process_display.markdown("   ♻️ Reusing results for an identical or near-identical tweet")
+            timing_info = render_span_tree(root) + "\n" + process_stats_report()
+            return list(ranked_gifs), dict(ranked_templates), list(keywords), timing_info
     
-    # First, get trending GIFs to extract popular tags
+    def remaining():
+        return max(deadline - (time.time() - pipeline_start), 0)
+    
+    # Start fetching trending GIFs; the cache fetch is blocking, so it runs in a worker thread
     process_display.markdown("   🔥 Fetching trending GIFs...")
-    trending_start = time.time()
-    trending_gifs, trending_time = get_trending_gifs(0, api_url, headers, process_display)
-    timing_info += f"Fetching trending GIFs: {trending_time:.2f}s\n"
+    trending_task = asyncio.ensure_future(asyncio.to_thread(get_trending_gifs, 0, api_url, headers, process_display))
+    
+    # A cold tag index needs this fetch before keywords can be extracted; a warm one doesn't
+    if len(trending_vocabulary) == 0:
+        await asyncio.wait({trending_task}, timeout=remaining())
+    trending_gifs = []
+    if trending_task.done():
+        trending_gifs, _ = trending_task.result()
     
-    # Extract tags from trending GIFs
-    tags_start = time.time()
-    trending_tags = extract_trending_tags(trending_gifs)
-    tags_time = time.time() - tags_start
-    process_display.markdown(f"   📊 Extracted {len(trending_tags)} unique tags from trending GIFs in {tags_time:.2f}s")
-    timing_info += f"Extracting tags: {tags_time:.2f}s\n"
+    # Top tags of the trending pool, as indexed by the trending loader
+    trending_tags = extract_trending_tags()
+    process_display.markdown(f"   📊 Selected the top {len(trending_tags)} of {len(trending_vocabulary)} trending tags")
     
     # Extract keywords from tweet, informed by trending tags
     process_display.markdown("   🔍 Finding viral keywords with GPT-4o-mini...")
-    keywords, keywords_timing = extract_keywords(tweet_text, trending_tags, process_display)
-    timing_info += keywords_timing
+    try:
+        keywords = await asyncio.wait_for(
+            extract_keywords(tweet_text, trending_tags, process_display, bypass_cache=bypass_cache), remaining()
+        )
+    except asyncio.TimeoutError:
+        keywords = []
+        root.set(keywords="deadline exceeded")
     
-    # Search GIFs using extracted keywords
-    all_gifs = []
-    search_start = time.time()
-    for keyword in keywords:
-        keyword_gifs, keyword_time = search_gifs(keyword, api_url, headers, process_display)
-        all_gifs.extend(keyword_gifs)
-        timing_info += f"Search '{keyword}': {keyword_time:.2f}s\n"
-    search_time = time.time() - search_start
-    timing_info += f"Total search time: {search_time:.2f}s\n"
+    # Search GIFs using extracted keywords, all keywords at once
+    all_gifs, _ = await search_keywords_concurrently(
+        keywords, api_url, headers, process_display, timeout=min(SEARCH_TIMEOUT, remaining())
+    )
     
-    # Include trending GIFs
+    # Include trending GIFs, if the overlapped fetch made it within the deadline
+    if not trending_task.done():
+        await asyncio.wait({trending_task}, timeout=remaining())
+        if trending_task.done():
+            trending_gifs, _ = trending_task.result()
+        else:
+            root.set(trending="deadline exceeded")
     process_display.markdown("   🔥 Adding trending GIFs to the mix for maximum viral potential...")
     all_gifs.extend(trending_gifs)
     
     # Remove duplicate GIFs based on ID
-    dedup_start = time.time()
-    unique_gifs = {gif["id"]: gif for gif in all_gifs}
-    dedup_time = time.time() - dedup_start
-    process_display.markdown(f"   ✨ Found {len(unique_gifs)} unique GIFs in {dedup_time:.2f}s")
-    timing_info += f"Deduplicating GIFs: {dedup_time:.2f}s\n"
+    with span("dedup") as dedup_span:
+        unique_gifs = {gif.id: gif for gif in all_gifs}
+        dedup_span.set(gifs_in=len(all_gifs), gifs_out=len(unique_gifs))
+    process_display.markdown(f"   ✨ Found {len(unique_gifs)} unique GIFs in {dedup_span.duration:.2f}s")
+    
+    # Shortlist the most relevant candidates locally so the ranking prompt stays small
+    candidates = prerank_gifs(tweet_text, keywords, list(unique_gifs.values()))
+    process_display.markdown(f"   🎯 Shortlisted {len(candidates)} of {len(unique_gifs)} GIFs for ranking")
+    
+    # The local ranking is ready up front, so it can be served the moment the LLM ranking misses its budget
+    with span("ranking.local"):
+        local_rankings = rank_gifs_locally(tweet_text, keywords, candidates)
     
-    # Rank GIFs using GPT-4o-mini for speed
+    # Rank GIFs using GPT-4o-mini, within the ranking budget and whatever is left of the deadline
     process_display.markdown("   🤖 Finding the most viral, relatable GIFs with GPT-4o-mini...")
-    ranked_gifs, ranking_timing = rank_gifs(tweet_text, list(unique_gifs.values()), process_display)
-    timing_info += ranking_timing
+    budget = min(RANKING_BUDGET, remaining())
+    fallback_reason = None
+    try:
+        ranked_gifs = await asyncio.wait_for(
+            rank_gifs(tweet_text, candidates, process_display, bypass_cache=bypass_cache, on_ranked=on_ranked),
+            budget,
+        )
+        if not ranked_gifs:
+            fallback_reason = "LLM returned no usable rankings"
+    except asyncio.TimeoutError:
+        fallback_reason = (f"ranking budget of {RANKING_BUDGET:g}s exceeded" if budget == RANKING_BUDGET
+                           else f"deadline of {deadline:g}s exceeded")
+    except Exception as e:
+        fallback_reason = f"LLM ranking failed ({type(e).__name__})"
+    
+    if fallback_reason is None:
+        ranking_paths["llm"] += 1
+        root.set(ranking="llm")
+    else:
+        ranked_gifs = local_rankings
+        ranking_paths["local"] += 1
+        root.set(ranking=f"local, {fallback_reason}")
+        process_display.markdown(f"   ⏱️ {fallback_reason} - showing the best local matches")
+    
+    # Reuse this result for the same or a near-identical tweet, unless it came from a fallback
+    if keywords and fallback_reason is None:
+        # Only the ranked templates are kept, not the whole candidate pool; like the
+        # callers, rankings naming templates outside the pool are skipped
+        ranked_templates = {gif["id"]: unique_gifs[gif["id"]] for gif in ranked_gifs if gif["id"] in unique_gifs}
+        result_cache.set(tweet_text, (ranked_gifs, ranked_templates, keywords))
+    
+    # Per-stage timings for this run, then the process-wide stats
+    timing_info = render_span_tree(root) + "\n" + process_stats_report()
     
     # Return the ranked GIFs, a dictionary of all GIFs for easy lookup, the extracted keywords, and timing info
-    return ranked_gifs, unique_gifs, keywords, timing_info
\ No newline at end of file
+    return ranked_gifs, unique_gifs, keywords, timing_info
+
+def process_tweet_and_rank_gifs(tweet_text: str, api_url: str, headers: dict, process_display, bypass_cache: bool = False,
+                                on_ranked=None, deadline: float = PIPELINE_DEADLINE, session_id: str = None) -> list:
+    """Process a tweet and rank GIFs based on viral potential using GPT-4o-mini for speed.
+
+    Set bypass_cache to skip the completion cache and force fresh LLM results.
+    Pass on_ranked(gif, position) to receive ranked GIFs while the ranking streams in.
+    session_id identifies the caller for fair queueing of OpenAI requests.
+    Runs the async pipeline on the shared event loop; progress updates and
+    on_ranked calls still happen on the calling thread.
+    """
+    # Resolve the OpenAI client here, where a missing key can still be shown in the page
+    get_openai_client()
+    relay = UIRelay()
+    return relay.run(process_tweet_and_rank_gifs_async(
+        tweet_text, api_url, headers, relay.wrap_display(process_display),
+        bypass_cache=bypass_cache, on_ranked=relay.wrap(on_ranked), deadline=deadline, session_id=session_id,
+    ))
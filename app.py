@@ -1,6 +1,7 @@
 import streamlit as st
 import traceback
 import time
+import uuid
 
 # Set page config must be the first Streamlit command
 st.set_page_config(
@@ -12,7 +13,13 @@ st.set_page_config(
 
 import requests
 from urllib.parse import quote
-from ai_utils import process_tweet_and_rank_gifs
+from ai_utils import (process_tweet_and_rank_gifs, prefetch_trending_gifs, start_catalog_sync, start_metrics_export,
+                      template_store)
+from card_grid import CARD_CSS, card_grid, gif_card_html, preview_variants
+from http_client import BASE_URL, HEADERS
+
+# Card styles, shared with the results grid component
+st.markdown(f"<style>{CARD_CSS}</style>", unsafe_allow_html=True)
 
 # Custom CSS
 st.markdown("""
@@ -108,134 +115,6 @@ st.markdown("""
         box-shadow: 0 4px 12px rgba(1, 0, 255, 0.3) !important;
     }
     
-    /* GIF Card Styling */
-    .gif-card {
-        background-color: var(--card-bg);
-        border-radius: 10px;
-        overflow: hidden;
-        box-shadow: 0 4px 20px rgba(0, 0, 0, 0.3);
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-        height: 100%;
-        display: flex;
-        flex-direction: column;
-        cursor: pointer;
-        border: 1px solid #333;
-        margin-bottom: 1.5rem;
-    }
-    
-    .gif-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 8px 25px rgba(1, 0, 255, 0.25);
-        border-color: var(--primary-color);
-    }
-    
-    .gif-preview-container {
-        width: 100%;
-        height: 600px;
-        overflow: hidden;
-        position: relative;
-        background-color: #000;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-    }
-    
-    .gif-preview {
-        max-width: 100%;
-        max-height: 100%;
-        object-fit: contain;
-    }
-    
-    .gif-info {
-        padding: 1rem;
-        display: flex;
-        flex-direction: column;
-        flex-grow: 1;
-    }
-    
-    .gif-card h3 {
-        font-size: 1.1rem;
-        margin: 0 0 0.5rem 0;
-        color: var(--text-primary);
-        font-weight: 600;
-    }
-    
-    .nft-count {
-        display: inline-block;
-        background-color: rgba(1, 0, 255, 0.15);
-        color: var(--primary-light);
-        padding: 0.3rem 0.6rem;
-        border-radius: 4px;
-        font-size: 0.8rem;
-        margin-bottom: 0.8rem;
-        font-weight: 500;
-    }
-    
-    .tags-container {
-        margin: 0.8rem 0;
-        max-height: 70px;
-        overflow-y: auto;
-        scrollbar-width: thin;
-        scrollbar-color: var(--primary-color) #333;
-        margin-bottom: auto;
-    }
-    
-    .tags-container::-webkit-scrollbar {
-        width: 6px;
-    }
-    
-    .tags-container::-webkit-scrollbar-track {
-        background: #333;
-        border-radius: 10px;
-    }
-    
-    .tags-container::-webkit-scrollbar-thumb {
-        background-color: var(--primary-color);
-        border-radius: 10px;
-    }
-    
-    .tag {
-        display: inline-block;
-        background-color: #2A2A2A;
-        color: var(--text-secondary);
-        padding: 0.2rem 0.5rem;
-        border-radius: 4px;
-        font-size: 0.75rem;
-        margin-right: 0.4rem;
-        margin-bottom: 0.4rem;
-    }
-    
-    .view-button {
-        display: block;
-        background-color: var(--primary-color);
-        color: var(--text-primary);
-        padding: 0.8rem 1rem;
-        border-radius: 6px;
-        text-decoration: none;
-        text-align: center;
-        font-size: 0.9rem;
-        font-weight: 600;
-        margin-top: 0.8rem;
-        width: 100%;
-        letter-spacing: 0.5px;
-        transition: all 0.3s ease;
-        border: none;
-        cursor: pointer;
-        height: auto;
-        min-height: 3rem;
-        white-space: normal;
-        line-height: 1.2;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-    }
-    
-    .view-button:hover {
-        background-color: var(--primary-light);
-        box-shadow: 0 4px 12px rgba(1, 0, 255, 0.3);
-        transform: translateY(-2px);
-    }
-    
     /* Keywords and Timing Info */
     .keywords {
         background-color: var(--card-bg);
@@ -264,6 +143,7 @@ st.markdown("""
         border-radius: 8px;
         margin-bottom: 1.5rem;
         font-size: 0.9rem;
+        white-space: pre-wrap;
     }
     
     /* Instructions Box */
@@ -357,10 +237,6 @@ st.markdown("""
             font-size: 1.8rem;
         }
         
-        .gif-preview-container {
-            height: 400px;
-        }
-        
         .section-header {
             font-size: 1.3rem;
         }
@@ -388,19 +264,6 @@ st.markdown("""
             padding: 1rem;
         }
         
-        .gif-preview-container {
-            height: 300px;
-        }
-        
-        .gif-info {
-            padding: 0.8rem;
-        }
-        
-        .view-button {
-            padding: 0.7rem 0.5rem;
-            font-size: 0.8rem;
-        }
-        
         .processing-container pre {
             font-size: 0.8rem;
         }
@@ -425,27 +288,11 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# API configuration
-BASE_URL = "https://3look.io/api/creative-studio/templates"
-HEADERS = {
-    "accept": "application/json, text/plain, */*",
-    "accept-language": "en-US,en;q=0.9",
-    "cache-control": "no-cache",
-    "pragma": "no-cache",
-    "sec-ch-ua": "\"Not(A:Brand\";v=\"99\", \"Google Chrome\";v=\"133\", \"Chromium\";v=\"133\"",
-    "sec-ch-ua-mobile": "?0",
-    "sec-ch-ua-platform": "\"macOS\"",
-    "sec-fetch-dest": "empty",
-    "sec-fetch-mode": "cors",
-    "sec-fetch-site": "same-origin"
-}
-
-def display_ranked_gifs(ranked_gifs, all_gifs_dict, keywords, timing_info):
-    """Display the ranked GIFs in a grid."""
+def display_ranked_gifs(ranked_ids, keywords, timing_info):
+    """Display the ranked GIFs in a grid, looking up each ID in the shared template store."""
     # Navigation buttons - only in main results view
-    if st.button("↺ New Search", key=f"new_search_results_view_{id(ranked_gifs)}", use_container_width=True):
-        st.session_state.ranked_gifs = None
-        st.session_state.all_gifs_dict = None
+    if st.button("↺ New Search", key=f"new_search_results_view_{id(ranked_ids)}", use_container_width=True):
+        st.session_state.ranked_ids = None
         st.session_state.keywords = None
         st.session_state.timing_info = None
         st.session_state.current_tweet = ""
@@ -461,61 +308,26 @@ def display_ranked_gifs(ranked_gifs, all_gifs_dict, keywords, timing_info):
     
     st.markdown("<div class='section-header'>CUSTOM GIF TEMPLATES</div>", unsafe_allow_html=True)
     
-    # Create three columns for desktop, two for tablet, one for mobile
-    cols = st.columns(3)
-    
-    # Display GIFs in the grid
-    for i, ranked_gif in enumerate(ranked_gifs):
-        gif_id = ranked_gif["id"]
-        gif = all_gifs_dict.get(gif_id)
-        if not gif:
-            continue
-            
-        col_idx = i % 3
-        with cols[col_idx]:
-            # Get NFT count from the correct field
-            nft_count = gif.get("amountOfNfts", 0)
-            
-            # Get tags
-            tags = gif.get("tags", [])
-            tags_html = ""
-            if tags:
-                tags_html = "<div class='tags-container'>" + "".join([f"<span class='tag'>{tag}</span>" for tag in tags[:10]]) + "</div>"
-            
-            # Get the GIF name and create a button label
-            gif_name = gif.get('name', 'GIF')
-            button_label = gif_name
-            
-            # Display the GIF card
-            st.markdown(f"""
-            <div class="gif-card">
-                <div class="gif-preview-container">
-                    <img src="{gif['previewUrl']}" alt="{gif['name']}" class="gif-preview">
-                </div>
-                <div class="gif-info">
-                    <h3>{gif['name']}</h3>
-                    <div class="nft-count">{nft_count} NFTs</div>
-                    {tags_html}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Create a truly unique key for each button by combining multiple identifiers
-            # Use both the index, gif_id and the object id of ranked_gifs to ensure uniqueness
-            unique_key = f"gif_button_{i}_{gif_id}_{id(ranked_gifs)}"
-            if st.button(button_label, key=unique_key, use_container_width=True):
-                st.session_state.show_details_for = gif_id
-                st.session_state.show_details_slug = gif['slug']
-                st.session_state.previous_tweet = st.session_state.get('current_tweet', '')
-                st.rerun()
+    # Templates evicted from the store since this search are skipped
+    gifs = template_store.resolve(ranked_ids)
+    
+    # The whole grid is one component; clicking a card opens its GIF maker
+    card_grid(gifs, key=f"card_grid_{id(ranked_ids)}", on_select=open_details)
+
+def open_details(template_id):
+    """Switch the results view to the GIF maker for a template."""
+    gif = template_store.get(template_id)
+    if gif:
+        st.query_params["template"] = gif.slug
+
+def close_details():
+    """Switch the results view back to the grid."""
+    st.query_params.pop("template", None)
 
 def show_gif_details(gif_slug):
     """Show GIF details in an iframe."""
     # Back button at the top with unique key
-    if st.button("← Back to Results", key="back_to_results_top_button", use_container_width=True):
-        st.session_state.show_details_for = None
-        st.session_state.show_details_slug = None
-        st.rerun()
+    st.button("← Back to Results", key="back_to_results_top_button", on_click=close_details, use_container_width=True)
     
     st.markdown("<div class='section-header'>GIF MAKER</div>", unsafe_allow_html=True)
     
@@ -537,19 +349,41 @@ def show_gif_details(gif_slug):
     """, unsafe_allow_html=True)
     
     # Back button at the bottom with unique key
-    if st.button("← Back to Results", key="back_to_results_bottom_button", use_container_width=True):
-        st.session_state.show_details_for = None
-        st.session_state.show_details_slug = None
-        st.rerun()
+    st.button("← Back to Results", key="back_to_results_bottom_button", on_click=close_details, use_container_width=True)
+
+@st.fragment
+def results_view():
+    """Show the GIF maker for the template in the URL, or else the current results grid.
+
+    Switching between the two only reruns this fragment, so the page CSS, the
+    input area and the pipeline are left alone. The open template lives in the
+    ?template= query parameter, which makes the GIF maker view addressable by URL.
+    """
+    template_slug = st.query_params.get("template")
+    if template_slug:
+        show_gif_details(template_slug)
+    elif st.session_state.get("ranked_ids") is not None:
+        display_ranked_gifs(
+            st.session_state.ranked_ids,
+            st.session_state.keywords,
+            st.session_state.timing_info
+        )
 
 def main():
-    # Initialize session state for showing details
-    if 'show_details_for' not in st.session_state:
-        st.session_state.show_details_for = None
-    if 'show_details_slug' not in st.session_state:
-        st.session_state.show_details_slug = None
     if 'current_tweet' not in st.session_state:
         st.session_state.current_tweet = ""
+    if 'session_id' not in st.session_state:
+        # Identifies this browser session for fair scheduling of OpenAI requests
+        st.session_state.session_id = uuid.uuid4().hex
+    
+    # Warm the shared trending cache while the user is typing
+    prefetch_trending_gifs(BASE_URL, HEADERS)
+    
+    # Keep the local template catalog in sync for fast keyword lookups
+    start_catalog_sync(BASE_URL, HEADERS)
+    
+    # Serve per-stage latency histograms when METRICS_PORT is configured
+    start_metrics_export()
     
     # App header with demon emoji
     st.markdown("""
@@ -559,11 +393,6 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    # If we're showing details for a specific GIF, display that instead of the main UI
-    if st.session_state.show_details_for and st.session_state.show_details_slug:
-        show_gif_details(st.session_state.show_details_slug)
-        return
-    
     # Input container
     st.markdown('<div class="input-container">', unsafe_allow_html=True)
     
@@ -572,6 +401,9 @@ def main():
                         value=st.session_state.get('current_tweet', ''),
                         height=200)
     
+    # Skip the completion cache when the user wants a fresh take on the same tweet
+    force_fresh = st.checkbox("Force fresh results", value=False, key="force_fresh_results")
+    
     # Process button with unique key
     analyze_clicked = st.button("Analyze & Find GIFs", key="analyze_button_main", use_container_width=True)
     
@@ -587,9 +419,9 @@ def main():
                 # Store current tweet
                 st.session_state.current_tweet = tweet
                 
-                # Clear any previous results
-                st.session_state.ranked_gifs = None
-                st.session_state.all_gifs_dict = None
+                # Clear any previous results and leave the GIF maker view
+                st.query_params.pop("template", None)
+                st.session_state.ranked_ids = None
                 st.session_state.keywords = None
                 st.session_state.timing_info = None
                 
@@ -605,30 +437,41 @@ def main():
                 </div>
                 """, unsafe_allow_html=True)
                 
+                # Render ranked GIFs as soon as the model names them, before the full ranking is done
+                stream_preview = st.container()
+                stream_cols = None
+                
+                def show_streamed_gif(gif, position):
+                    nonlocal stream_cols
+                    if stream_cols is None:
+                        stream_preview.markdown("<div class='section-header'>TOP MATCHES SO FAR</div>", unsafe_allow_html=True)
+                        stream_cols = stream_preview.columns(3)
+                    stream_cols[position % 3].markdown(gif_card_html(gif, preview_variants(gif)), unsafe_allow_html=True)
+                
                 # Process tweet and get ranked GIFs
-                ranked_gifs, all_gifs_dict, keywords, timing_info = process_tweet_and_rank_gifs(
+                ranked_gifs, _, keywords, timing_info = process_tweet_and_rank_gifs(
                     tweet_text=tweet,
                     api_url=BASE_URL,
                     headers=HEADERS,
-                    process_display=process_display
+                    process_display=process_display,
+                    bypass_cache=force_fresh,
+                    on_ranked=show_streamed_gif,
+                    session_id=st.session_state.session_id
                 )
                 
                 # Add total time
                 total_time = time.time() - start_time
                 timing_info += f"Total processing time: {total_time:.2f}s\n"
                 
-                # Store results in session state
-                st.session_state.ranked_gifs = ranked_gifs
-                st.session_state.all_gifs_dict = all_gifs_dict
+                # Store only the ranked IDs in session state; the records live in the shared template store
+                ranked_ids = [ranked_gif["id"] for ranked_gif in ranked_gifs]
+                st.session_state.ranked_ids = ranked_ids
                 st.session_state.keywords = keywords
                 st.session_state.timing_info = timing_info
                 
                 # Clear the process display
                 process_display.empty()
                 
-                # Display results
-                display_ranked_gifs(ranked_gifs, all_gifs_dict, keywords, timing_info)
-                
                 # Rerun to display results
                 st.rerun()
             except Exception as e:
@@ -638,14 +481,8 @@ def main():
         else:
             st.warning("Please enter a tweet or topic to analyze.")
     
-    # If we have results in session state, display them
-    if hasattr(st.session_state, 'ranked_gifs') and st.session_state.ranked_gifs is not None:
-        display_ranked_gifs(
-            st.session_state.ranked_gifs, 
-            st.session_state.all_gifs_dict,
-            st.session_state.keywords,
-            st.session_state.timing_info
-        )
+    # Results grid or GIF maker; navigating between them reruns only this part of the page
+    results_view()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,87 @@
+import asyncio
+import queue
+import threading
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop, starting its thread on first use.
+
+    Every pipeline run in the process is scheduled on this one loop, so async
+    HTTP and OpenAI clients (and their connection pools) are shared across
+    Streamlit sessions instead of being rebuilt for each asyncio.run().
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, daemon=True, name="pipeline-event-loop")
+            thread.start()
+            _loop = loop
+        return _loop
+
+class UIRelay:
+    """Runs UI callbacks made on the event loop back on the calling thread.
+
+    Streamlit elements can only be updated from the script thread that owns
+    them, so coroutines on the shared loop enqueue their calls here and the
+    script thread replays them while it waits for the result.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def wrap(self, callback):
+        """Return a thread-safe stand-in for callback, or None if callback is None."""
+        if callback is None:
+            return None
+
+        def relayed(*args, **kwargs):
+            self._queue.put((callback, args, kwargs))
+        return relayed
+
+    def wrap_display(self, display):
+        """Return a stand-in for a Streamlit placeholder whose methods are relayed."""
+        return RelayedDisplay(self, display)
+
+    def _drain(self):
+        while True:
+            try:
+                callback, args, kwargs = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            callback(*args, **kwargs)
+
+    def run(self, coro):
+        """Run a coroutine on the shared loop, replaying UI calls until it finishes."""
+        future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+        try:
+            while not future.done():
+                try:
+                    callback, args, kwargs = self._queue.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                callback(*args, **kwargs)
+        except BaseException:
+            # The script was stopped (e.g. the user hit Stop); don't leave the run going
+            future.cancel()
+            raise
+        self._drain()
+        return future.result()
+
+class RelayedDisplay:
+    """Proxy for a Streamlit placeholder that relays every method call."""
+
+    def __init__(self, relay: UIRelay, display):
+        self._relay = relay
+        self._display = display
+
+    def __getattr__(self, name):
+        return self._relay.wrap(getattr(self._display, name))
+
+class NullDisplay:
+    """Stand-in for a Streamlit placeholder that ignores every call, for headless runs."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
@@ -0,0 +1,128 @@
+"""Rank GIFs for a file of tweets without the Streamlit UI.
+
+Reads tweets from JSONL (one object per line with a "text" or "tweet" field
+and an optional "id") or CSV (same column names), runs the pipeline for
+several tweets at once, and appends one JSON line per tweet to the output
+as soon as it finishes:
+
+    python batch.py scheduled_tweets.csv suggestions.jsonl --concurrency 4
+
+The output doubles as the checkpoint: rerunning the same command skips
+tweets that already have a successful result, so a crashed batch resumes
+where it stopped. Tweets without an "id" are identified by their row number.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from async_runtime import NullDisplay
+from ai_utils import PIPELINE_DEADLINE, get_openai_client, prefetch_trending_gifs, process_tweet_and_rank_gifs
+from http_client import BASE_URL, HEADERS
+
+def read_tweets(path: str) -> list:
+    """Return (id, text) pairs from a JSONL or CSV file, skipping rows without text."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    tweets = []
+    for number, row in enumerate(rows, start=1):
+        text = (row.get("text") or row.get("tweet") or "").strip()
+        if text:
+            tweets.append((str(row.get("id") or f"row-{number}"), text))
+    return tweets
+
+def completed_ids(path: str) -> set:
+    """IDs with a successful result in an existing output file."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by a crash; that tweet is simply run again
+                continue
+            if not record.get("error"):
+                done.add(record["id"])
+    return done
+
+def rank_tweet(tweet_id: str, text: str, base_url: str, headers: dict, bypass_cache: bool, deadline: float) -> dict:
+    start_time = time.time()
+    try:
+        ranked_gifs, unique_gifs, keywords, _ = process_tweet_and_rank_gifs(
+            text, base_url, headers, NullDisplay(), bypass_cache=bypass_cache, deadline=deadline, session_id="batch"
+        )
+    except Exception as e:
+        return {"id": tweet_id, "text": text, "error": f"{type(e).__name__}: {e}"}
+    gifs = [unique_gifs[ranked["id"]].to_dict() for ranked in ranked_gifs if ranked["id"] in unique_gifs]
+    record = {
+        "id": tweet_id,
+        "text": text,
+        "keywords": keywords,
+        "gifs": gifs,
+        "seconds": round(time.time() - start_time, 3),
+    }
+    # The pipeline degrades to no GIFs when 3look or OpenAI is down or the deadline passes;
+    # recording that as an error keeps it out of the checkpoint so the next run retries it
+    if not gifs:
+        record["error"] = "no GIFs returned"
+    return record
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="tweets as .jsonl or .csv")
+    parser.add_argument("output", help="results .jsonl; also the checkpoint for resuming")
+    parser.add_argument("--concurrency", type=int, default=4, help="tweets processed at once")
+    parser.add_argument("--deadline", type=float, default=PIPELINE_DEADLINE, help="seconds allowed per tweet")
+    parser.add_argument("--fresh", action="store_true", help="bypass the LLM completion cache")
+    parser.add_argument("--base-url", default=BASE_URL, help="3look templates API URL")
+    args = parser.parse_args()
+
+    tweets = read_tweets(args.input)
+    done = completed_ids(args.output)
+    pending = [(tweet_id, text) for tweet_id, text in tweets if tweet_id not in done]
+    print(f"{len(tweets)} tweets, {len(tweets) - len(pending)} already done, {len(pending)} to run", file=sys.stderr)
+    if not pending:
+        return
+
+    # Fail fast on a missing API key, and start the shared trending fetch every tweet will reuse
+    get_openai_client()
+    prefetch_trending_gifs(args.base_url, HEADERS)
+
+    # Finish a line a crash may have cut short, so new results start on a line of their own
+    if os.path.exists(args.output) and os.path.getsize(args.output):
+        with open(args.output, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+        if needs_newline:
+            with open(args.output, "a", encoding="utf-8") as f:
+                f.write("\n")
+
+    failures = 0
+    start_time = time.time()
+    with open(args.output, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [
+            pool.submit(rank_tweet, tweet_id, text, args.base_url, HEADERS, args.fresh, args.deadline)
+            for tweet_id, text in pending
+        ]
+        for finished, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if record.get("error"):
+                failures += 1
+            status = f"error: {record['error']}" if record.get("error") else f"{len(record['gifs'])} GIFs"
+            print(f"[{finished}/{len(pending)}] {record['id']}: {status}", file=sys.stderr)
+
+    print(f"Done in {time.time() - start_time:.1f}s, {failures} failed", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
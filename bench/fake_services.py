@@ -0,0 +1,223 @@
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Words synthetic templates and tweets are built from
+VOCABULARY = (
+    "mood", "chaos", "vibes", "cat", "dog", "fail", "win", "dance", "cry", "laugh", "shock", "bored",
+    "monday", "friday", "coffee", "pizza", "gym", "sleep", "party", "hype", "cringe", "slay", "rizz",
+    "drama", "panic", "facepalm", "shrug", "wave", "love", "rage", "money", "crypto", "moon", "rocket",
+    "meme", "anime", "retro", "pixel", "glitch", "demon", "angel", "fire", "ice", "storm", "sunset",
+    "office", "school", "exam", "deadline", "weekend", "vacation", "beach", "rain", "snow", "hungry",
+)
+
+def synthetic_catalog(size: int, seed: int = 0) -> list:
+    """Build a catalog of template payloads shaped like the 3look templates API."""
+    rng = random.Random(seed)
+    templates = []
+    for i in range(size):
+        words = rng.sample(VOCABULARY, 2)
+        template_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        templates.append({
+            "id": template_id,
+            "name": " ".join(words).title(),
+            "slug": f"{'-'.join(words)}-{i}",
+            "tags": rng.sample(VOCABULARY, rng.randint(3, 12)),
+            "amountOfNfts": int(rng.paretovariate(1.2) * 10),
+            "previewUrl": f"https://example.invalid/previews/{template_id}.gif",
+        })
+    return templates
+
+def load_catalog(path: str) -> list:
+    """Load a recorded catalog: a list of templates or a {"templates": [...]} response."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data["templates"] if isinstance(data, dict) else data
+
+def synthetic_tweets(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [f"when the {' and the '.join(rng.sample(VOCABULARY, 3))} hits different" for _ in range(count)]
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, (len(text) + 3) // 4)
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class FakeThreeLookHandler(_QuietHandler):
+    """Serves the templates endpoint: cursor paging, keyword search and trending order."""
+
+    catalog = []
+    trending = []
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        params = parse_qs(urlparse(self.path).query)
+        offset = int((params.get("cursor") or ["0"])[0] or 0)
+        take = int((params.get("take") or ["25"])[0])
+        match = re.search(r"query:'(.*?)'", (params.get("filters") or [""])[0])
+        if match:
+            terms = match.group(1).lower().split()
+            templates = [
+                t for t in self.catalog
+                if all(term in t["name"].lower() or term in {tag.lower() for tag in t.get("tags", [])} for term in terms)
+            ]
+        elif (params.get("is_trending") or ["false"])[0] == "true":
+            templates = self.trending
+        else:
+            templates = self.catalog
+        page = templates[offset:offset + take]
+        payload = {"templates": page}
+        if offset + take < len(templates):
+            payload["nextCursor"] = str(offset + take)
+        self.send_json(payload)
+
+class FakeOpenAIHandler(_QuietHandler):
+    """OpenAI-compatible /v1/chat/completions with simulated latency and token rate.
+
+    Keyword prompts are answered with words from the tweet that exist in the
+    catalog; ranking prompts with a shuffled list of the candidate numbers.
+    With requests_per_minute set, requests over that rate get a 429 with
+    Retry-After, like the real API.
+    """
+
+    vocabulary = frozenset()
+    first_token_latency = 0.0
+    token_rate = 0.0
+    requests_per_minute = 0
+    recent_requests = None
+    rate_lock = None
+
+    def over_rate_limit(self) -> float:
+        """Record a request; return seconds to wait if it is over the limit, else 0."""
+        if not self.requests_per_minute:
+            return 0.0
+        with self.rate_lock:
+            now = time.monotonic()
+            while self.recent_requests and now - self.recent_requests[0] >= 60:
+                self.recent_requests.popleft()
+            if len(self.recent_requests) >= self.requests_per_minute:
+                return 60 - (now - self.recent_requests[0])
+            self.recent_requests.append(now)
+            return 0.0
+
+    def respond(self, prompt: str) -> str:
+        rng = random.Random(prompt)
+        tweet = re.search(r'Tweet: "(.*?)"', prompt, re.S)
+        if "extract exactly 3 keywords" in prompt:
+            words = [w for w in re.findall(r"\w+", tweet.group(1).lower() if tweet else "") if w in self.vocabulary]
+            keywords = list(dict.fromkeys(words))[:3] or rng.sample(sorted(self.vocabulary), 3)
+            return json.dumps({"keywords": keywords})
+        candidates = re.search(r"each as \[number, name, tags\]: (\[.*?\])\n", prompt, re.S)
+        aliases = [row[0] for row in json.loads(candidates.group(1))] if candidates else []
+        rng.shuffle(aliases)
+        return json.dumps({"rankings": aliases[:24]})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json({"error": {"message": "not found"}}, status=404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        retry_after = self.over_rate_limit()
+        if retry_after:
+            body = json.dumps({"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}).encode("utf-8")
+            self.send_response(429)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Retry-After", f"{retry_after:.3f}")
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        prompt = "\n".join(message.get("content") or "" for message in request["messages"])
+        content = self.respond(prompt)
+        usage = {
+            "prompt_tokens": _estimate_tokens(prompt),
+            "completion_tokens": _estimate_tokens(content),
+            "total_tokens": _estimate_tokens(prompt) + _estimate_tokens(content),
+        }
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()), "model": request.get("model", "")}
+        token_delay = 1.0 / self.token_rate if self.token_rate > 0 else 0.0
+        time.sleep(self.first_token_latency)
+
+        if not request.get("stream"):
+            time.sleep(token_delay * usage["completion_tokens"])
+            self.send_json(dict(base, object="chat.completion", usage=usage, choices=[{
+                "index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop",
+            }]))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        chunks = [content[i:i + 4] for i in range(0, len(content), 4)]
+        for i, piece in enumerate(chunks):
+            if i:
+                time.sleep(token_delay)
+            self._send_event(dict(base, object="chat.completion.chunk", choices=[{
+                "index": 0, "delta": {"content": piece}, "finish_reason": None,
+            }]))
+        self._send_event(dict(base, object="chat.completion.chunk", choices=[{
+            "index": 0, "delta": {}, "finish_reason": "stop",
+        }]))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self._send_event(dict(base, object="chat.completion.chunk", choices=[], usage=usage))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _send_event(self, payload: dict):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+def _serve(handler) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def start_fake_services(catalog: list, api_latency: float = 0.0, first_token_latency: float = 0.0,
+                        token_rate: float = 0.0, requests_per_minute: int = 0) -> dict:
+    """Start the fake templates API and OpenAI servers on free local ports.
+
+    Returns their base URLs and the server objects (call shutdown() when done).
+    """
+    threelook_handler = type("ThreeLookHandler", (FakeThreeLookHandler,), {
+        "catalog": catalog,
+        "trending": sorted(catalog, key=lambda t: t.get("amountOfNfts", 0), reverse=True),
+        "latency": api_latency,
+    })
+    openai_handler = type("OpenAIHandler", (FakeOpenAIHandler,), {
+        "vocabulary": frozenset(tag.lower() for t in catalog for tag in t.get("tags", [])),
+        "first_token_latency": first_token_latency,
+        "token_rate": token_rate,
+        "requests_per_minute": requests_per_minute,
+        "recent_requests": deque(),
+        "rate_lock": threading.Lock(),
+    })
+    threelook_server = _serve(threelook_handler)
+    openai_server = _serve(openai_handler)
+    return {
+        "templates_url": f"http://127.0.0.1:{threelook_server.server_port}/api/creative-studio/templates",
+        "openai_url": f"http://127.0.0.1:{openai_server.server_port}/v1",
+        "servers": [threelook_server, openai_server],
+    }
@@ -0,0 +1,103 @@
+"""Render benchmark for the results grid.
+
+Runs the results grid through Streamlit's AppTest harness twice, once
+rendered as per-card markdown blocks and buttons in columns (the previous
+layout) and once as the single card_grid component, and reports the
+elements each run sends to the browser and the median script time for the
+first render of new results and for reruns:
+
+    python -m bench.grid_render
+    python -m bench.grid_render --cards 24 --reruns 20
+"""
+import argparse
+import os
+import statistics
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def per_card_script(root: str, count: int, seed: int):
+    """The previous layout: a markdown block and a button per card, spread over three columns."""
+    import sys
+    import time
+    sys.path.insert(0, root)
+    import streamlit as st
+    from bench.grid_render import sample_templates
+    from card_grid import gif_card_html, preview_variants
+
+    start = time.perf_counter()
+    cols = st.columns(3)
+    for i, gif in enumerate(sample_templates(count, seed)):
+        with cols[i % 3]:
+            st.markdown(gif_card_html(gif, preview_variants(gif)), unsafe_allow_html=True)
+            st.button(gif.name or "GIF", key=f"gif_button_{i}_{gif.id}", use_container_width=True)
+    st.session_state.render_seconds = time.perf_counter() - start
+
+def component_script(root: str, count: int, seed: int):
+    """The whole grid as one component with memoized card HTML."""
+    import sys
+    import time
+    sys.path.insert(0, root)
+    import streamlit as st
+    from bench.grid_render import sample_templates
+    from card_grid import card_grid
+
+    start = time.perf_counter()
+    card_grid(sample_templates(count, seed), key="card_grid", on_select=lambda template_id: None)
+    st.session_state.render_seconds = time.perf_counter() - start
+
+_samples = {}
+
+def sample_templates(count: int, seed: int) -> list:
+    """Synthetic templates, the same records on every rerun as with the shared template store."""
+    if (count, seed) not in _samples:
+        from bench.fake_services import synthetic_catalog
+        from templates import parse_templates
+        _samples[count, seed] = parse_templates(synthetic_catalog(count, seed=seed))
+    return _samples[count, seed]
+
+def count_elements(node) -> int:
+    """Elements and blocks in a rendered AppTest tree, one delta message each."""
+    children = getattr(node, "children", None) or {}
+    return 1 + sum(count_elements(child) for child in children.values())
+
+def measure(script, cards: int, reruns: int) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    # A warm-up render with other templates takes the one-time setup (imports, component
+    # registration) out of the numbers, like a server that has already shown other results
+    for seed in (1, 0):
+        app = AppTest.from_function(script, args=(ROOT, cards, seed), default_timeout=30)
+        app.run()
+        if app.exception:
+            raise RuntimeError(f"{script.__name__} failed: {app.exception}")
+    first = app.session_state.render_seconds
+    # The root and its main/sidebar containers are always there
+    elements = count_elements(app._tree) - 3
+    timings = []
+    for _ in range(reruns):
+        app.run()
+        timings.append(app.session_state.render_seconds)
+    return {"elements": elements, "first": first, "rerun": statistics.median(timings)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=24, help="cards in the grid")
+    parser.add_argument("--reruns", type=int, default=10, help="reruns timed after the first render")
+    args = parser.parse_args()
+
+    # Synthetic preview URLs point nowhere, so don't queue preview downloads for them
+    os.environ["PREVIEWS_ENABLED"] = "0"
+    sys.path.insert(0, ROOT)
+
+    results = {
+        "per-card markdown + buttons": measure(per_card_script, args.cards, args.reruns),
+        "card_grid component": measure(component_script, args.cards, args.reruns),
+    }
+    print(f"{args.cards} cards, median of {args.reruns} reruns")
+    print(f"{'layout':<30}{'elements':>10}{'first ms':>10}{'rerun ms':>10}")
+    for name, result in results.items():
+        print(f"{name:<30}{result['elements']:>10}{result['first'] * 1000:>10.2f}{result['rerun'] * 1000:>10.2f}")
+
+if __name__ == "__main__":
+    main()
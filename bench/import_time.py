@@ -0,0 +1,62 @@
+"""Import-time benchmark for the app's modules.
+
+Imports each module in a fresh interpreter several times and reports the
+median wall time plus the slowest imports it pulls in (from -X importtime).
+Exits non-zero when a module exceeds its budget, so startup regressions can
+fail a CI step:
+
+    python -m bench.import_time
+    python -m bench.import_time --modules ai_utils --budget 0.5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure(module: str, repeat: int) -> tuple:
+    """Return (median seconds, [(cumulative microseconds, imported module)]) for importing module."""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    # Importing must not need credentials or the network
+    env = dict(os.environ, OPENAI_API_KEY="")
+    timings = []
+    slowest = []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                                   capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+        timings.append(float(completed.stdout.strip().splitlines()[-1]))
+        slowest = []
+        for line in completed.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            # Only top-level imports, i.e. what this module pulls in directly
+            if name.startswith("   ") and not name.startswith("    "):
+                slowest.append((int(cumulative), name.strip()))
+    return statistics.median(timings), sorted(slowest, reverse=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", default="ai_utils", help="comma-separated modules to import")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument("--budget", type=float, default=0.6, help="maximum median import time in seconds")
+    parser.add_argument("--top", type=int, default=8, help="number of slowest imports to list")
+    args = parser.parse_args()
+
+    over_budget = []
+    for module in args.modules.split(","):
+        median, slowest = measure(module, args.repeat)
+        status = "ok" if median <= args.budget else "OVER BUDGET"
+        print(f"{module}: {median:.3f}s median over {args.repeat} runs (budget {args.budget:g}s) {status}")
+        for cumulative, name in slowest[:args.top]:
+            print(f"  {cumulative / 1e6:.3f}s  {name}")
+        if median > args.budget:
+            over_budget.append(module)
+    sys.exit(1 if over_budget else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Offline benchmark for the tweet -> ranked GIFs pipeline.
+
+Starts local stand-ins for the 3look templates API and the OpenAI chat API,
+then drives process_tweet_and_rank_gifs at each candidate-pool size and
+concurrency level and reports per-stage p50/p95 and throughput, compared
+with a stored baseline:
+
+    python -m bench.run --pool-sizes 24,60,96 --concurrency 1,4 --runs 20
+    python -m bench.run --save-baseline
+
+Each scenario runs in a fresh subprocess so module-level caches and config
+(PRERANK_TOP_N etc.) start from scratch.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from async_runtime import NullDisplay
+from bench.fake_services import load_catalog, start_fake_services, synthetic_catalog, synthetic_tweets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "bench", "baseline.json")
+
+def run_scenario(args):
+    """Worker side: run the pipeline against the fake services and print one JSON result line."""
+    import ai_utils
+    from tracing import LatencyHistograms, tracer
+
+    tweets = synthetic_tweets(args.runs + 1, seed=args.seed)
+
+    def run_one(tweet):
+        ranked, _, _, _ = ai_utils.process_tweet_and_rank_gifs(
+            tweet, args.templates_url, {}, NullDisplay(), bypass_cache=not args.warm_caches
+        )
+        return len(ranked)
+
+    # One warm-up run opens connections and fills the trending cache, then start counting afresh
+    run_one(tweets[0])
+    tracer.histograms = LatencyHistograms()
+    ai_utils.ranking_paths.clear()
+    open(tracer.jsonl_path, "w").close()
+
+    errors = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=int(args.concurrency)) as pool:
+        futures = [pool.submit(run_one, tweet) for tweet in tweets[1:]]
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                errors += 1
+    wall_time = time.perf_counter() - start
+
+    # Actual ranking pool sizes come from the exported traces
+    pool_sizes = []
+    with open(tracer.jsonl_path, encoding="utf-8") as f:
+        for line in f:
+            stack = [json.loads(line)["trace"]]
+            while stack:
+                item = stack.pop()
+                if item["name"] == "ranking" and "candidates" in item["attributes"]:
+                    pool_sizes.append(item["attributes"]["candidates"])
+                stack.extend(item["children"])
+
+    result = {
+        "runs": args.runs,
+        "errors": errors,
+        "throughput": args.runs / wall_time if wall_time else 0.0,
+        "mean_candidates": sum(pool_sizes) / len(pool_sizes) if pool_sizes else 0,
+        "rate_limited": ai_utils.openai_limiter.stats()["rate_limited"],
+        "ranked_locally": ai_utils.ranking_paths["local"],
+        "stages": {name: {"p50": stats["p50"], "p95": stats["p95"], "count": stats["count"]}
+                   for name, stats in tracer.histograms.snapshot().items()},
+    }
+    print(json.dumps(result))
+
+def launch_scenario(args, services: dict, pool_size: int, concurrency: int) -> dict:
+    """Run one scenario in a fresh interpreter and return its parsed result."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            OPENAI_API_KEY="bench",
+            OPENAI_BASE_URL=services["openai_url"],
+            LLM_CACHE_PATH=os.path.join(tmp, "llm_cache.sqlite3"),
+            TRACE_JSONL_PATH=os.path.join(tmp, "traces.jsonl"),
+            CATALOG_ENABLED="0",
+            PRERANK_TOP_N=str(pool_size),
+        )
+        env.pop("METRICS_PORT", None)
+        if not args.warm_caches:
+            env["SEARCH_CACHE_TTL"] = "0"
+            env["RESULT_CACHE_TTL"] = "0"
+        command = [
+            sys.executable, "-m", "bench.run", "--worker",
+            "--templates-url", services["templates_url"],
+            "--runs", str(args.runs), "--concurrency", str(concurrency), "--seed", str(args.seed),
+        ]
+        if args.warm_caches:
+            command.append("--warm-caches")
+        completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Scenario pool={pool_size} concurrency={concurrency} failed:\n{completed.stderr}")
+    # The app prints its own log lines; the result is the last line
+    return json.loads([line for line in completed.stdout.splitlines() if line.startswith("{")][-1])
+
+def _delta(value: float, baseline: float) -> str:
+    if not baseline:
+        return ""
+    return f"{(value - baseline) / baseline * 100:+.0f}%"
+
+def print_report(key: str, result: dict, baseline: dict):
+    print(f"\n== {key} (mean ranking pool {result['mean_candidates']:.0f}, {result['errors']} errors, "
+          f"{result.get('rate_limited', 0)} rate limited, {result.get('ranked_locally', 0)} ranked locally) ==")
+    print(f"{'stage':<16}{'p50':>9}{'p95':>9}{'base p50':>10}{'base p95':>10}{'Δp50':>7}{'Δp95':>7}")
+    for name, stats in result["stages"].items():
+        base = baseline.get("stages", {}).get(name, {})
+        base_p50 = f"{base['p50']:.3f}" if base else "-"
+        base_p95 = f"{base['p95']:.3f}" if base else "-"
+        print(f"{name:<16}{stats['p50']:>9.3f}{stats['p95']:>9.3f}{base_p50:>10}{base_p95:>10}"
+              f"{_delta(stats['p50'], base.get('p50')):>7}{_delta(stats['p95'], base.get('p95')):>7}")
+    base_throughput = baseline.get("throughput")
+    line = f"throughput: {result['throughput']:.2f} runs/s"
+    if base_throughput:
+        line += f" (baseline {base_throughput:.2f}, {_delta(result['throughput'], base_throughput)})"
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalog", help="recorded catalog JSON to serve instead of a synthetic one")
+    parser.add_argument("--catalog-size", type=int, default=2000, help="size of the synthetic catalog")
+    parser.add_argument("--pool-sizes", default="24,60,96", help="comma-separated PRERANK_TOP_N values")
+    parser.add_argument("--concurrency", default="1,4", help="comma-separated numbers of concurrent sessions")
+    parser.add_argument("--runs", type=int, default=20, help="pipeline runs per scenario")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="templates API latency in seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="seconds to the first LLM token")
+    parser.add_argument("--llm-token-rate", type=float, default=150, help="LLM output tokens per second")
+    parser.add_argument("--llm-rpm", type=int, default=0, help="requests per minute before the fake API returns 429s")
+    parser.add_argument("--warm-caches", action="store_true", help="keep the search and LLM caches on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--templates-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_scenario(args)
+        return
+
+    catalog = load_catalog(args.catalog) if args.catalog else synthetic_catalog(args.catalog_size, seed=args.seed)
+    services = start_fake_services(catalog, api_latency=args.api_latency,
+                                   first_token_latency=args.llm_latency, token_rate=args.llm_token_rate,
+                                   requests_per_minute=args.llm_rpm)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to store one")
+
+    results = {}
+    try:
+        for pool_size in [int(n) for n in args.pool_sizes.split(",")]:
+            for concurrency in [int(n) for n in args.concurrency.split(",")]:
+                key = f"pool={pool_size} concurrency={concurrency}"
+                results[key] = launch_scenario(args, services, pool_size, concurrency)
+                print_report(key, results[key], baseline.get(key, {}))
+    finally:
+        for server in services["servers"]:
+            server.shutdown()
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nSaved baseline to {args.baseline}")
+
+if __name__ == "__main__":
+    main()
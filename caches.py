@@ -0,0 +1,156 @@
+from collections import OrderedDict
+import threading
+import time
+
+class StaleWhileRevalidateCache:
+    """Thread-safe TTL cache that serves stale entries while refreshing them.
+
+    A fresh entry is returned as-is. A stale entry is still returned right away,
+    and a single background thread is started to reload it. Only a key that has
+    never been loaded makes the caller wait for the loader.
+
+    Loaders signal failure by raising; failures are never cached, so a stale
+    entry stays in place until a refresh succeeds.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def get(self, key, loader) -> tuple:
+        """Return (value, status) where status is "hit", "stale" or "miss"."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, loaded_at = entry
+                if time.monotonic() - loaded_at < self.ttl:
+                    self.hits += 1
+                    return value, "hit"
+                self.stale_hits += 1
+                self._start_refresh(key, loader)
+                return value, "stale"
+            self.misses += 1
+
+        value = loader()
+        self.set(key, value)
+        return value, "miss"
+
+    def prefetch(self, key, loader):
+        """Load a missing or stale key in the background without waiting for it."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                return
+            self._start_refresh(key, loader)
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+
+    def _start_refresh(self, key, loader):
+        # Caller holds the lock; at most one refresh per key is in flight
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        thread = threading.Thread(target=self._refresh, args=(key, loader), daemon=True,
+                                  name="cache-refresh")
+        thread.start()
+
+    def _refresh(self, key, loader):
+        try:
+            value = loader()
+        except Exception:
+            with self._lock:
+                self.refresh_failures += 1
+                self._refreshing.discard(key)
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self.refreshes += 1
+            self._refreshing.discard(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+            }
+
+class LRUTTLCache:
+    """Thread-safe LRU cache whose entries also expire after a TTL.
+
+    Memory is bounded both by entry count and by an approximate byte size that
+    the caller supplies for each value through ``sizeof``. The least recently
+    used entries are evicted first whenever either limit is exceeded.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int, sizeof=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, stored_at, size = entry
+            if time.monotonic() - stored_at >= self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            # A single value larger than the whole budget is not worth caching
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, time.monotonic(), size)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def _remove(self, key):
+        # Caller holds the lock
+        _, _, size = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,117 @@
+"""Results grid rendered as a single Streamlit component.
+
+The whole grid of cards goes to the browser as one element instead of a
+markdown block and a button per card, and a click on any card comes back as
+the component's value. Card HTML is memoized per template, so a rerun only
+joins strings that were already built.
+"""
+import html
+import os
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from ai_utils import preview_cache
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "card_grid_frontend")
+
+# Card styles, also injected into the app page for cards rendered outside the grid
+with open(os.path.join(FRONTEND_DIR, "cards.css"), encoding="utf-8") as f:
+    CARD_CSS = f.read()
+
+_grid_component = components.declare_component("card_grid", path=FRONTEND_DIR)
+
+# Memoized grid cell HTML per template ID, least recently used first
+CARD_CACHE_MAX_ENTRIES = 2048
+_cells = OrderedDict()
+_cells_lock = threading.Lock()
+
+def preview_variants(gif):
+    """Return the downscaled previews for a template if they are ready, queueing them otherwise."""
+    if preview_cache is None or not gif.preview_url:
+        return None
+    return preview_cache.variants(gif.preview_url)
+
+def escape(value) -> str:
+    """Escape a value for HTML text or a quoted attribute; template fields come from the 3look API."""
+    return html.escape(str(value), quote=True)
+
+def gif_preview_html(gif, previews):
+    """Build the preview area of a GIF card, using the downscaled previews once they are ready."""
+    if previews is None:
+        # Still being made (or unavailable): show the original GIF
+        return f"""<div class="gif-preview-container">
+            <img src="{escape(gif.preview_url)}" alt="{escape(gif.name)}" class="gif-preview">
+        </div>"""
+
+    # The small poster paints first as the background; the animation loads lazily on top of it
+    sizes = "(max-width: 640px) 100vw, 33vw"
+    webp_srcset = escape(", ".join(f"{url} {width}w" for width, url in sorted(previews["webp"].items())))
+    gif_srcset = escape(", ".join(f"{url} {width}w" for width, url in sorted(previews["gif"].items())))
+    largest_gif = escape(previews["gif"][max(previews["gif"])])
+    return f"""<div class="gif-preview-container" style="background-image: url('{escape(previews["poster"])}')">
+            <picture>
+                <source type="image/webp" srcset="{webp_srcset}" sizes="{sizes}">
+                <img src="{largest_gif}" srcset="{gif_srcset}" sizes="{sizes}" alt="{escape(gif.name)}" class="gif-preview" loading="lazy" decoding="async">
+            </picture>
+        </div>"""
+
+def gif_card_html(gif, previews):
+    """Build the HTML for a single GIF card."""
+    # Get NFT count from the correct field
+    nft_count = gif.nft_count
+
+    # Get tags
+    tags = gif.tags
+    tags_html = ""
+    if tags:
+        tags_html = "<div class='tags-container'>" + "".join([f"<span class='tag'>{escape(tag)}</span>" for tag in tags[:10]]) + "</div>"
+
+    return f"""
+    <div class="gif-card">
+        {gif_preview_html(gif, previews)}
+        <div class="gif-info">
+            <h3>{escape(gif.name)}</h3>
+            <div class="nft-count">{escape(nft_count)} NFTs</div>
+            {tags_html}
+        </div>
+    </div>
+    """
+
+def card_cell_html(gif) -> str:
+    """Return the grid cell for a template (its card plus a select button), built once per template.
+
+    A cell is rebuilt when its previews become ready or the template's record
+    is replaced in the store.
+    """
+    previews = preview_variants(gif)
+    poster = previews["poster"] if previews is not None else None
+    with _cells_lock:
+        cached = _cells.get(gif.id)
+        if cached is not None and cached[0] is gif and cached[1] == poster:
+            _cells.move_to_end(gif.id)
+            return cached[2]
+
+    cell = (f'<div class="card-cell">{gif_card_html(gif, previews)}'
+            f'<button class="view-button" data-template-id="{escape(gif.id)}">{escape(gif.name or "GIF")}</button></div>')
+    with _cells_lock:
+        _cells[gif.id] = (gif, poster, cell)
+        _cells.move_to_end(gif.id)
+        while len(_cells) > CARD_CACHE_MAX_ENTRIES:
+            _cells.popitem(last=False)
+    return cell
+
+def card_grid(gifs: list, key: str, on_select):
+    """Render the cards for gifs as one component.
+
+    on_select(template_id) runs as a widget callback when a card is clicked,
+    before the rerun the click triggers (only the enclosing fragment, if any).
+    """
+    def selected():
+        value = st.session_state[key]
+        if value:
+            on_select(value["id"])
+
+    _grid_component(html="".join(card_cell_html(gif) for gif in gifs), key=key, default=None, on_change=selected)
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from http_client import build_templates_url, next_cursor, threelook_client
+from templates import Template
+from text_utils import tokenize
+from tracing import span
+
+class TemplateCatalog:
+    """Local SQLite copy of the 3look template catalog with a full-text index.
+
+    Templates are stored by ID together with a fingerprint of their payload, so
+    each sync only rewrites templates that changed. Name and tags are indexed
+    with FTS5 for keyword lookups that don't leave the process.
+    """
+
+    def __init__(self, path: str, max_age: float):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.last_sync_stats = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS templates (
+                    id TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    popularity INTEGER NOT NULL DEFAULT 0,
+                    seen_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS templates_fts USING fts5(
+                    id UNINDEXED, name, tags, tokenize = 'unicode61 remove_diacritics 2'
+                )
+            """)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def last_synced_at(self) -> float:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = 'last_full_sync'").fetchone()
+        return float(row[0]) if row else 0.0
+
+    def is_fresh(self) -> bool:
+        """True once a full sync has completed within max_age."""
+        return time.time() - self.last_synced_at() < self.max_age
+
+    def apply(self, templates: list, seen_at: float) -> tuple:
+        """Upsert a page of templates by ID. Returns (added, updated, unchanged) counts."""
+        added = updated = unchanged = 0
+        with self._lock, self._conn:
+            for template in templates:
+                payload = json.dumps(template, sort_keys=True, separators=(",", ":"))
+                fingerprint = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+                row = self._conn.execute("SELECT fingerprint FROM templates WHERE id = ?", (template["id"],)).fetchone()
+                if row is not None and row[0] == fingerprint:
+                    self._conn.execute("UPDATE templates SET seen_at = ? WHERE id = ?", (seen_at, template["id"]))
+                    unchanged += 1
+                    continue
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO templates (id, payload, fingerprint, popularity, seen_at) VALUES (?, ?, ?, ?, ?)",
+                    (template["id"], payload, fingerprint, template.get("amountOfNfts", 0) or 0, seen_at),
+                )
+                self._conn.execute("DELETE FROM templates_fts WHERE id = ?", (template["id"],))
+                # Like Template.from_api, a null name or tag list is empty
+                tags = " ".join(str(tag) for tag in template.get("tags") or () if tag is not None)
+                self._conn.execute(
+                    "INSERT INTO templates_fts (id, name, tags) VALUES (?, ?, ?)",
+                    (template["id"], template.get("name") or "", tags),
+                )
+                if row is None:
+                    added += 1
+                else:
+                    updated += 1
+        return added, updated, unchanged
+
+    def finish_sync(self, started_at: float, remove: bool = True) -> int:
+        """Mark the catalog fresh, first dropping templates the crawl no longer returned if remove is set."""
+        with self._lock, self._conn:
+            removed_ids = [row[0] for row in self._conn.execute(
+                "SELECT id FROM templates WHERE seen_at < ?", (started_at,)
+            )] if remove else []
+            self._conn.executemany("DELETE FROM templates WHERE id = ?", [(i,) for i in removed_ids])
+            self._conn.executemany("DELETE FROM templates_fts WHERE id = ?", [(i,) for i in removed_ids])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('last_full_sync', ?)", (str(time.time()),)
+            )
+        return len(removed_ids)
+
+    def search(self, keyword: str, limit: int = 25) -> list:
+        """Full-text search over template names and tags, best matches first, as Template records."""
+        terms = tokenize(keyword)
+        if not terms:
+            return []
+        # Quote every term so user text can't inject FTS query syntax
+        match = " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+        with self._lock:
+            self.lookups += 1
+            rows = self._conn.execute("""
+                SELECT templates.payload
+                FROM templates_fts JOIN templates ON templates.id = templates_fts.id
+                WHERE templates_fts MATCH ?
+                ORDER BY bm25(templates_fts, 0.0, 2.0, 1.0), templates.popularity DESC
+                LIMIT ?
+            """, (match, limit)).fetchall()
+        return [Template.from_api(json.loads(row[0])) for row in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM templates").fetchone()[0]
+        return {"templates": count, "lookups": self.lookups, "fresh": self.is_fresh(), **self.last_sync_stats}
+
+def sync_catalog(catalog: TemplateCatalog, base_url: str, headers: dict, page_size: int = 100, max_pages: int = 200) -> dict:
+    """Crawl every template page for the widget and apply the changes to the catalog.
+
+    The catalog is marked fresh once the crawl runs out of pages, but removals
+    are only applied on an explicit end of data (a short or empty page). A full
+    page without a next cursor ends the crawl without deleting anything, since
+    a cursor field under an unexpected name looks the same, and a failed or
+    truncated (max_pages) crawl neither deletes templates nor marks the catalog fresh.
+    """
+    started_at = time.time()
+    cursor = ""
+    added = updated = unchanged = removed = pages = 0
+    complete = end_of_data = False
+    while pages < max_pages:
+        response = threelook_client.get(build_templates_url(base_url, cursor=cursor, take=page_size), headers=headers)
+        response.raise_for_status()
+        payload = response.json()
+        templates = payload.get("templates", [])
+        pages += 1
+        page_added, page_updated, page_unchanged = catalog.apply(templates, started_at)
+        added += page_added
+        updated += page_updated
+        unchanged += page_unchanged
+        if len(templates) < page_size:
+            complete = end_of_data = True
+            break
+        cursor = next_cursor(payload)
+        # A full page without a next cursor may be the last one, or the cursor may be missed
+        if not cursor:
+            complete = True
+            break
+    if complete:
+        removed = catalog.finish_sync(started_at, remove=end_of_data)
+    stats = {
+        "pages": pages,
+        "added": added,
+        "updated": updated,
+        "unchanged": unchanged,
+        "removed": removed,
+        "complete": complete,
+        "end_of_data": end_of_data,
+        "duration": time.time() - started_at,
+    }
+    catalog.last_sync_stats = {"last_sync": stats}
+    return stats
+
+class CatalogSyncer:
+    """Background thread that keeps a TemplateCatalog in sync with 3look."""
+
+    def __init__(self, catalog: TemplateCatalog, interval: float, page_size: int = 100, max_pages: int = 200,
+                 retry_delay: float = 60.0):
+        self.catalog = catalog
+        self.interval = interval
+        self.retry_delay = retry_delay
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, base_url: str, headers: dict):
+        """Start syncing in the background; calling it again is a no-op."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, args=(base_url, dict(headers)), daemon=True, name="catalog-sync"
+            )
+            self._thread.start()
+
+    def _run(self, base_url: str, headers: dict):
+        while True:
+            # A catalog synced recently (e.g. before a restart) doesn't need an immediate crawl
+            wait = self.catalog.last_synced_at() + self.interval - time.time()
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            # Each sync is its own trace; a failure is recorded on the span as its error type
+            try:
+                with span("catalog.sync") as sync_span:
+                    stats = sync_catalog(self.catalog, base_url, headers, self.page_size, self.max_pages)
+                    sync_span.set(**stats)
+                # A truncated crawl doesn't mark the catalog fresh, so wait a full interval before retrying
+                if not stats["complete"]:
+                    time.sleep(self.interval)
+            except Exception:
+                time.sleep(self.retry_delay)
@@ -0,0 +1,192 @@
+import os
+import threading
+from urllib.parse import quote
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import AsyncRetrying, Retrying, retry_if_exception_type, retry_if_result, stop_after_attempt, wait_random_exponential
+from tracing import span
+
+# API configuration
+BASE_URL = "https://3look.io/api/creative-studio/templates"
+HEADERS = {
+    "accept": "application/json, text/plain, */*",
+    "accept-language": "en-US,en;q=0.9",
+    "cache-control": "no-cache",
+    "pragma": "no-cache",
+    "sec-ch-ua": "\"Not(A:Brand\";v=\"99\", \"Google Chrome\";v=\"133\", \"Chromium\";v=\"133\"",
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": "\"macOS\"",
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-origin"
+}
+
+# Categories excluded from every templates query for the tensorians widget
+EXCLUDED_CATEGORIES = (
+    "305e1658-f986-4879-b927-484fa945ed23",
+    "738e63e4-d126-4c58-8d08-17d06672dee1",
+)
+
+def build_templates_url(base_url: str, cursor: str = "", query: str = None, trending: bool = False,
+                        take: int = 25) -> str:
+    """Build a templates API URL for the tensorians widget."""
+    filters = f"query:'{query}',types:gif" if query else "types:gif"
+    excluded = "".join(f"&excluded_categories[]={category}" for category in EXCLUDED_CATEGORIES)
+    is_trending = "true" if trending else "false"
+    return f"{base_url}?cursor={quote(cursor, safe='')}&filters={filters}&widget=tensorians{excluded}&take={take}&is_trending={is_trending}"
+
+def next_cursor(payload: dict):
+    """Return the cursor for the next page of a templates response, or None on the last page."""
+    for key in ("nextCursor", "next_cursor", "cursor"):
+        cursor = payload.get(key)
+        if cursor:
+            return str(cursor)
+    return None
+
+# Status codes worth retrying: rate limiting and server-side errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def is_retryable_response(response) -> bool:
+    """Return True if a response should be retried."""
+    return response.status_code in RETRYABLE_STATUS_CODES
+
+class ThreeLookClient:
+    """Process-wide HTTP client for the 3look API.
+
+    Wraps a single requests.Session so every session of the app shares one
+    keep-alive connection pool. Every request gets connect/read timeouts and
+    is retried with jittered exponential backoff on 429/5xx responses and
+    connection errors.
+    """
+
+    def __init__(self, pool_size: int = 32, connect_timeout: float = 3.05, read_timeout: float = 10.0,
+                 max_attempts: int = 3, max_backoff: float = 4.0):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+        self._lock = threading.Lock()
+        self.retries = 0
+
+    def _count_retry(self, retry_state):
+        with self._lock:
+            self.retries += 1
+
+    def _get(self, url: str, headers: dict = None) -> requests.Response:
+        with span("http.get", client="sync") as http_span:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            http_span.set(status=response.status_code)
+            return response
+
+    def get(self, url: str, headers: dict = None) -> requests.Response:
+        """GET a URL through the shared pool, retrying transient failures.
+
+        Returns the last response if every attempt came back with a retryable
+        status, and raises the last exception if every attempt failed to connect.
+        """
+        retrying = Retrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=wait_random_exponential(multiplier=0.25, max=self.max_backoff),
+            retry=retry_if_result(is_retryable_response) | retry_if_exception_type(requests.ConnectionError),
+            before_sleep=self._count_retry,
+            retry_error_callback=lambda retry_state: retry_state.outcome.result(),
+        )
+        return retrying(self._get, url, headers=headers)
+
+    def stats(self) -> dict:
+        """Return connection pool counters across all hosts.
+
+        urllib3 counts every request and every new connection per host pool,
+        so requests that didn't need a new connection reused a pooled one.
+        """
+        pools = self.adapter.poolmanager.pools
+        total_requests = 0
+        new_connections = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            total_requests += pool.num_requests
+            new_connections += pool.num_connections
+        return {
+            "requests": total_requests,
+            "new_connections": new_connections,
+            "reused_connections": max(total_requests - new_connections, 0),
+            "retries": self.retries,
+        }
+
+# Shared client used by every 3look call in the process
+threelook_client = ThreeLookClient(
+    pool_size=int(os.getenv("THREELOOK_POOL_SIZE", "32")),
+    connect_timeout=float(os.getenv("THREELOOK_CONNECT_TIMEOUT", "3.05")),
+    read_timeout=float(os.getenv("THREELOOK_READ_TIMEOUT", "10")),
+    max_attempts=int(os.getenv("THREELOOK_MAX_ATTEMPTS", "3")),
+)
+
+class AsyncThreeLookClient:
+    """Async counterpart of ThreeLookClient built on httpx.
+
+    Meant to live on the process-wide event loop: one AsyncClient keeps a
+    keep-alive pool shared by every pipeline run, with the same timeouts and
+    jittered retry policy as the sync client.
+    """
+
+    def __init__(self, pool_size: int = 32, connect_timeout: float = 3.05, read_timeout: float = 10.0,
+                 max_attempts: int = 3, max_backoff: float = 4.0):
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+        self.requests = 0
+        self.new_connections = 0
+        self.retries = 0
+
+    async def _trace(self, event_name: str, info: dict):
+        # httpcore reports every TCP connect; anything else was served from the pool
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+
+    def _count_retry(self, retry_state):
+        self.retries += 1
+
+    async def _get(self, url: str, headers: dict = None) -> httpx.Response:
+        self.requests += 1
+        with span("http.get", client="async") as http_span:
+            response = await self.client.get(url, headers=headers, extensions={"trace": self._trace})
+            http_span.set(status=response.status_code)
+            return response
+
+    async def get(self, url: str, headers: dict = None) -> httpx.Response:
+        """GET a URL through the shared pool, retrying transient failures."""
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=wait_random_exponential(multiplier=0.25, max=self.max_backoff),
+            retry=retry_if_result(is_retryable_response) | retry_if_exception_type((httpx.ConnectError, httpx.ConnectTimeout)),
+            before_sleep=self._count_retry,
+            retry_error_callback=lambda retry_state: retry_state.outcome.result(),
+        )
+        return await retrying(self._get, url, headers=headers)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused_connections": max(self.requests - self.new_connections, 0),
+            "retries": self.retries,
+        }
+
+# Shared async client; only used from the process-wide pipeline event loop
+async_threelook_client = AsyncThreeLookClient(
+    pool_size=int(os.getenv("THREELOOK_POOL_SIZE", "32")),
+    connect_timeout=float(os.getenv("THREELOOK_CONNECT_TIMEOUT", "3.05")),
+    read_timeout=float(os.getenv("THREELOOK_READ_TIMEOUT", "10")),
+    max_attempts=int(os.getenv("THREELOOK_MAX_ATTEMPTS", "3")),
+)
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class CompletionCache:
+    """SQLite-backed cache of chat completion responses.
+
+    Entries are keyed by a hash of the model, messages and response format, so
+    the same prompt returns the stored completion across restarts. The table is
+    bounded by entry count and total content size; the least recently used
+    entries are evicted first.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS completions (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS completions_last_used ON completions (last_used_at)")
+
+    @staticmethod
+    def make_key(model: str, messages: list, response_format: dict = None) -> str:
+        """Hash everything that affects the completion into a stable key."""
+        payload = json.dumps(
+            {"model": model, "messages": messages, "response_format": response_format},
+            sort_keys=True, separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """Return the cached completion content, or None."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT content FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE completions SET last_used_at = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, model: str, content: str):
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, model, content, size, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, content, size, now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        # Caller holds the lock and an open transaction
+        count, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+        if count <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM completions ORDER BY last_used_at").fetchall()
+        stale_keys = []
+        for key, size in rows:
+            if count <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            stale_keys.append((key,))
+            count -= 1
+            total_bytes -= size
+        self._conn.executemany("DELETE FROM completions WHERE key = ?", stale_keys)
+        self.evictions += len(stale_keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+            ).fetchone()
+            return {
+                "entries": count,
+                "bytes": total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,76 @@
+import math
+from collections import Counter
+from templates import Template
+from text_utils import tokenize
+
+class BM25Index:
+    """In-memory Okapi BM25 index over a small list of token lists."""
+
+    def __init__(self, documents: list, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(document) for document in documents]
+        self.lengths = [len(document) for document in documents]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+        document_frequency = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def scores(self, query: list) -> list:
+        """Score every document against a list of query tokens."""
+        query_counts = Counter(query)
+        results = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+            score = 0.0
+            for term, weight in query_counts.items():
+                frequency = counts.get(term)
+                if not frequency:
+                    continue
+                score += weight * self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            results.append(score)
+        return results
+
+def template_tokens(gif: Template) -> list:
+    """Tokens describing a template: its name plus every tag."""
+    tokens = tokenize(gif.name)
+    for tag in gif.tags:
+        tokens.extend(tokenize(tag))
+    return tokens
+
+def relevance_scores(tweet_text: str, keywords: list, gifs: list) -> list:
+    """BM25 relevance of each template to the tweet, with extracted keywords counting twice."""
+    query = tokenize(tweet_text)
+    for keyword in keywords:
+        query.extend(tokenize(keyword) * 2)
+    return BM25Index([template_tokens(gif) for gif in gifs]).scores(query)
+
+def shortlist_gifs(tweet_text: str, keywords: list, gifs: list, top_n: int) -> list:
+    """Return the top_n templates by BM25 relevance to the tweet and keywords.
+
+    Ties keep the original candidate order, so the result is deterministic.
+    """
+    if len(gifs) <= top_n:
+        return list(gifs)
+
+    scores = relevance_scores(tweet_text, keywords, gifs)
+    order = sorted(range(len(gifs)), key=lambda i: (-scores[i], i))
+    return [gifs[i] for i in order[:top_n]]
+
+def rank_locally(tweet_text: str, keywords: list, gifs: list, top_n: int, popularity_weight: float = 0.1) -> list:
+    """Rank templates without the LLM: BM25 relevance plus a popularity boost.
+
+    The boost is popularity_weight * log(1 + amountOfNfts), so among similarly
+    relevant templates the ones people mint more often come first. Ties keep
+    the original candidate order, so the result is deterministic.
+    """
+    scores = relevance_scores(tweet_text, keywords, gifs) if gifs else []
+    scores = [score + popularity_weight * math.log1p(max(gif.nft_count, 0)) for score, gif in zip(scores, gifs)]
+    order = sorted(range(len(gifs)), key=lambda i: (-scores[i], i))
+    return [gifs[i] for i in order[:top_n]]
@@ -0,0 +1,216 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import span
+
+class PreviewCache:
+    """Small preview images for template GIFs, generated in the background and kept on disk.
+
+    Each source GIF is fetched once and turned into a static poster frame plus
+    animated GIF and WebP copies at a few widths. Files are named by the
+    SHA-256 of the source bytes, so identical GIFs behind different URLs share
+    one set, and the directory is kept under max_bytes by deleting the least
+    recently used sets. A small ref file per source URL records which set it
+    maps to, so finished work survives restarts.
+
+    variants() never blocks the caller: it returns the URLs of a finished set,
+    or None after queueing the work on the worker pool. A source that failed is
+    tried again once retry_after seconds have passed.
+    """
+
+    def __init__(self, directory: str, url_prefix: str, fetch, widths: tuple = (240, 480),
+                 max_bytes: int = 256 * 1024 * 1024, workers: int = 4, retry_after: float = 300.0):
+        self.directory = directory
+        self.url_prefix = url_prefix.rstrip("/")
+        self.fetch = fetch
+        self.widths = tuple(sorted(widths))
+        self.max_bytes = max_bytes
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preview")
+        self._lock = threading.Lock()
+        # digest -> {"bytes": size on disk, "files": [names]}, least recently used first
+        self._sets = None
+        self._ready = {}
+        self._pending = set()
+        # source URL -> time of its last failure
+        self._failed = {}
+        self.total_bytes = 0
+        self.generated = 0
+        self.failures = 0
+        self.evictions = 0
+
+    def variants(self, source_url: str):
+        """Return {"poster", "gif", "webp"} URLs for a finished preview set, or None while it is being made.
+
+        "gif" and "webp" map each width to a URL. Sources that failed to
+        download or decode also return None until they are retried, so callers fall back to the original.
+        """
+        with self._lock:
+            digest = self._ready.get(source_url)
+            if digest is not None and self._sets is not None and digest in self._sets:
+                self._sets.move_to_end(digest)
+                return self._urls(digest)
+            # Not made yet, or evicted since
+            self._ready.pop(source_url, None)
+            if source_url in self._pending:
+                return None
+            failed_at = self._failed.get(source_url)
+            if failed_at is not None and time.monotonic() - failed_at < self.retry_after:
+                return None
+            self._failed.pop(source_url, None)
+            self._pending.add(source_url)
+        self._pool.submit(self._generate, source_url)
+        return None
+
+    def _urls(self, digest: str) -> dict:
+        urls = {"poster": None, "gif": {}, "webp": {}}
+        for name in self._sets[digest]["files"]:
+            _, variant, extension = name.split(".")
+            url = f"{self.url_prefix}/{name}"
+            if variant == "poster":
+                urls["poster"] = url
+            else:
+                urls[extension][int(variant[1:])] = url
+        return urls
+
+    def _generate(self, source_url: str):
+        try:
+            with span("preview") as preview_span:
+                self._load_index()
+                digest = self._read_ref(source_url)
+                with self._lock:
+                    known = digest is not None and digest in self._sets
+                if not known:
+                    response = self.fetch(source_url)
+                    response.raise_for_status()
+                    data = response.content
+                    digest = hashlib.sha256(data).hexdigest()[:32]
+                    with self._lock:
+                        known = digest in self._sets
+                    if not known:
+                        self._add_set(digest, self._encode(data, digest))
+                    self._write_ref(source_url, digest)
+                preview_span.set(generated=not known)
+            with self._lock:
+                self._ready[source_url] = digest
+        except Exception:
+            # The preview span has recorded the error type
+            now = time.monotonic()
+            with self._lock:
+                self.failures += 1
+                self._failed[source_url] = now
+                # Forget failures old enough to be retried, so the map only holds recent ones
+                for url in [url for url, failed_at in self._failed.items() if now - failed_at >= self.retry_after]:
+                    del self._failed[url]
+        finally:
+            with self._lock:
+                self._pending.discard(source_url)
+
+    def _encode(self, data: bytes, digest: str) -> list:
+        """Write the poster and animated variants for one source GIF, returning the file names."""
+        # Pillow is only needed once the first preview is made, not at import
+        from PIL import Image, ImageSequence
+
+        with Image.open(io.BytesIO(data)) as image:
+            widths = sorted({min(width, image.width) for width in self.widths})
+            frames = {width: [] for width in widths}
+            durations = []
+            # Downscale frame by frame so the full-size frames are never all held at once
+            for frame in ImageSequence.Iterator(image):
+                rgba = frame.convert("RGBA")
+                durations.append(frame.info.get("duration", 100))
+                for width in widths:
+                    height = max(1, round(rgba.height * width / rgba.width))
+                    frames[width].append(rgba if width == rgba.width else rgba.resize((width, height), Image.LANCZOS))
+
+        names = [self._save(f"{digest}.poster.webp", frames[widths[-1]][0], "WEBP", quality=80)]
+        for width in widths:
+            first, rest = frames[width][0], frames[width][1:]
+            names.append(self._save(f"{digest}.w{width}.webp", first, "WEBP", save_all=True, append_images=rest,
+                                    duration=durations, loop=0, quality=75))
+            names.append(self._save(f"{digest}.w{width}.gif", first, "GIF", save_all=True, append_images=rest,
+                                    duration=durations, loop=0, disposal=2, optimize=True))
+        return names
+
+    def _save(self, name: str, image, image_format: str, **options) -> str:
+        # Written under a temporary name so a half-written file is never served
+        path = os.path.join(self.directory, name)
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        image.save(temporary, format=image_format, **options)
+        os.replace(temporary, path)
+        return name
+
+    def _ref_path(self, source_url: str) -> str:
+        return os.path.join(self.directory, "refs", hashlib.sha256(source_url.encode("utf-8")).hexdigest()[:32])
+
+    def _read_ref(self, source_url: str):
+        try:
+            with open(self._ref_path(source_url), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _write_ref(self, source_url: str, digest: str):
+        path = self._ref_path(source_url)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(digest)
+        os.replace(path + ".tmp", path)
+
+    def _load_index(self):
+        """Scan the cache directory once, ordering existing sets by age."""
+        with self._lock:
+            if self._sets is not None:
+                return
+            os.makedirs(os.path.join(self.directory, "refs"), exist_ok=True)
+            found = {}
+            for entry in os.scandir(self.directory):
+                if not entry.is_file() or entry.name.endswith(".tmp"):
+                    continue
+                stat = entry.stat()
+                size, mtime, names = found.get(entry.name.split(".")[0], (0, 0.0, []))
+                names.append(entry.name)
+                found[entry.name.split(".")[0]] = (size + stat.st_size, max(mtime, stat.st_mtime), names)
+            self._sets = OrderedDict()
+            for digest, (size, _, names) in sorted(found.items(), key=lambda item: item[1][1]):
+                self._sets[digest] = {"bytes": size, "files": names}
+                self.total_bytes += size
+            self._evict()
+
+    def _add_set(self, digest: str, names: list):
+        size = sum(os.path.getsize(os.path.join(self.directory, name)) for name in names)
+        with self._lock:
+            if digest in self._sets:
+                # The same GIF behind another URL finished first; its files were just rewritten in place
+                return
+            self._sets[digest] = {"bytes": size, "files": names}
+            self.total_bytes += size
+            self.generated += 1
+            self._evict()
+
+    def _evict(self):
+        # Caller holds the lock; the newest set is kept even if it alone is over budget
+        while self.total_bytes > self.max_bytes and len(self._sets) > 1:
+            _, evicted = self._sets.popitem(last=False)
+            self.total_bytes -= evicted["bytes"]
+            self.evictions += 1
+            for name in evicted["files"]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sets": len(self._sets or ()),
+                "bytes": self.total_bytes,
+                "pending": len(self._pending),
+                "generated": self.generated,
+                "failures": self.failures,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,91 @@
+import json
+from templates import Template
+from text_utils import estimate_tokens
+
+class CandidateEncoder:
+    """Compact encoding of ranking candidates for the LLM prompt.
+
+    Each candidate gets a short integer alias instead of its UUID, and its tags
+    are deduplicated and trimmed to a per-item budget. The model answers with a
+    list of aliases, which decode() maps back to template IDs.
+    """
+
+    def __init__(self, gifs: list, max_tags: int = 8, max_tag_tokens: int = 24):
+        self.gifs = gifs
+        self.max_tags = max_tags
+        self.max_tag_tokens = max_tag_tokens
+        self.alias_to_id = {alias: gif.id for alias, gif in enumerate(gifs, start=1)}
+
+    def trim_tags(self, gif: Template) -> list:
+        """Deduplicate tags (case-insensitively) and keep the first ones within budget."""
+        seen = set()
+        name = gif.name.strip().lower()
+        tags = []
+        budget = self.max_tag_tokens
+        for tag in gif.tags:
+            tag = " ".join(tag.split())
+            normalized = tag.lower()
+            # A tag that just repeats the name adds nothing to the prompt
+            if not normalized or normalized in seen or normalized == name:
+                continue
+            cost = estimate_tokens(tag)
+            if len(tags) >= self.max_tags or cost > budget:
+                break
+            seen.add(normalized)
+            tags.append(tag)
+            budget -= cost
+        return tags
+
+    def encode(self) -> str:
+        """Return the candidates as a compact JSON list of [alias, name, tags] rows."""
+        rows = [[alias, gif.name, self.trim_tags(gif)] for alias, gif in enumerate(self.gifs, start=1)]
+        return json.dumps(rows, separators=(",", ":"), ensure_ascii=False)
+
+    def decode(self, rankings: list) -> list:
+        """Map ranked aliases back to template IDs, skipping unknown and repeated entries.
+
+        Aliases may be ints or digit strings; anything else (booleans, floats,
+        other strings) is skipped rather than coerced to a neighbouring alias.
+        Also accepts {"id": ...} objects in case the model ignores the alias
+        format, as long as the ID is an alias or one of the candidates' IDs.
+        """
+        known_ids = set(self.alias_to_id.values())
+        ids = []
+        seen = set()
+        for entry in rankings:
+            if isinstance(entry, dict):
+                entry = entry.get("id")
+                if isinstance(entry, str) and entry in known_ids:
+                    gif_id = entry
+                else:
+                    gif_id = self._alias(entry)
+            else:
+                gif_id = self._alias(entry)
+            if gif_id is None or gif_id in seen:
+                continue
+            seen.add(gif_id)
+            ids.append(gif_id)
+        return ids
+
+    def _alias(self, entry):
+        """Template ID for an int or digit-string alias, or None."""
+        if isinstance(entry, int) and not isinstance(entry, bool):
+            return self.alias_to_id.get(entry)
+        if isinstance(entry, str) and entry.strip().isascii() and entry.strip().isdigit():
+            return self.alias_to_id.get(int(entry))
+        return None
+
+    def token_report(self, ranked_count: int = 24) -> dict:
+        """Estimate prompt and completion tokens for the full encoding versus the compact one."""
+        full_candidates = json.dumps([
+            {"id": gif.id, "name": gif.name, "tags": gif.tags} for gif in self.gifs
+        ])
+        ranked = self.gifs[:ranked_count]
+        full_completion = json.dumps({"rankings": [{"id": gif.id} for gif in ranked]})
+        compact_completion = json.dumps({"rankings": list(range(1, len(ranked) + 1))})
+        return {
+            "prompt_before": estimate_tokens(full_candidates),
+            "prompt_after": estimate_tokens(self.encode()),
+            "completion_before": estimate_tokens(full_completion),
+            "completion_after": estimate_tokens(compact_completion),
+        }
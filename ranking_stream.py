@@ -0,0 +1,43 @@
+import re
+
+# A complete ranking entry: an integer alias, bare or as a digit string, followed
+# by a separator, or an {"id": "..."} object whose closing quote has arrived
+RANKED_ENTRY_RE = re.compile(
+    r'(?<![\w."])(\d+)(?=\s*[,\]])|"(\d+)"(?=\s*[,\]])|\{\s*"id"\s*:\s*"((?:[^"\\]|\\.)*)"'
+)
+
+class RankingStreamParser:
+    """Incrementally pull ranked entries out of a streamed {"rankings": [...]} response.
+
+    Feed it the response text as it arrives; each call returns the entries that
+    completed in that chunk, in order and without duplicates. Aliases are
+    returned as ints, "3" the same as 3, and {"id": ...} entries as {"id": ...}
+    dicts, the same shapes CandidateEncoder.decode takes from the final parse.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = None
+        self.seen = set()
+
+    def feed(self, text: str) -> list:
+        self.buffer += text
+        if self.position is None:
+            start = self.buffer.find('"rankings"')
+            if start == -1:
+                return []
+            self.position = start + len('"rankings"')
+
+        new_entries = []
+        for match in RANKED_ENTRY_RE.finditer(self.buffer, self.position):
+            self.position = match.end()
+            alias, quoted_alias, gif_id = match.groups()
+            if gif_id is not None:
+                key, entry = ("id", gif_id), {"id": gif_id}
+            else:
+                entry = int(alias if alias is not None else quoted_alias)
+                key = ("alias", entry)
+            if key not in self.seen:
+                self.seen.add(key)
+                new_entries.append(entry)
+        return new_entries
@@ -0,0 +1,148 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+
+# Session the current pipeline run belongs to, used for fair scheduling
+current_session = ContextVar("rate_limit_session", default=None)
+
+class TokenBucket:
+    """Budget that refills continuously up to a per-minute limit."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available (a request larger than the bucket only waits for a full one)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        # May go negative when actual usage turns out higher than estimated
+        self._refill()
+        self.level -= amount
+
+class Permit:
+    __slots__ = ("session", "tokens", "wait")
+
+    def __init__(self, session, tokens: int, wait: float):
+        self.session = session
+        self.tokens = tokens
+        self.wait = wait
+
+class AdaptiveRateLimiter:
+    """Process-wide limiter for OpenAI calls, meant for the shared event loop.
+
+    A request needs one unit from the requests-per-minute bucket, its
+    estimated tokens from the tokens-per-minute bucket, and a concurrency
+    slot. Requests that can't start yet wait in per-session queues served
+    round-robin, so one busy session can't starve the others.
+
+    The concurrency limit adapts (AIMD): each success raises it by 1/limit up
+    to max_concurrency, and each 429 halves it and pauses all new requests
+    for the server's Retry-After.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, max_concurrency: int,
+                 min_concurrency: int = 1):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self._queues = OrderedDict()
+        self._paused_until = 0.0
+        self._timer = None
+        self.granted = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+
+    async def acquire(self, tokens: int) -> Permit:
+        """Wait for a turn to send a request estimated at tokens tokens."""
+        session = current_session.get()
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(session, deque()).append((future, tokens))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted just as the caller was cancelled: hand the slot back
+            if future.done() and not future.cancelled():
+                self.in_flight -= 1
+            self._dispatch()
+            raise
+        wait = time.monotonic() - start
+        self.total_wait += wait
+        return Permit(session, tokens, wait)
+
+    def release(self, permit: Permit, outcome: str = "ok", used_tokens: int = None, retry_after: float = None):
+        """Finish a request, correcting the token estimate and adapting the concurrency limit.
+
+        outcome is "ok", "rate_limited" (a 429) or "error"; errors leave the limit as it is.
+        """
+        self.in_flight -= 1
+        if used_tokens is not None:
+            self.tokens.take(used_tokens - permit.tokens)
+        if outcome == "rate_limited":
+            self.rate_limited += 1
+            self.limit = max(float(self.min_concurrency), self.limit / 2)
+            self._paused_until = max(self._paused_until, time.monotonic() + (retry_after or 1.0))
+        elif outcome == "ok":
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+        self._dispatch()
+
+    def _schedule(self, delay: float):
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant queued requests, one per session in turn, while slots and budget last."""
+        while self._queues and self.in_flight < int(self.limit):
+            session, queue = next(iter(self._queues.items()))
+            future, tokens = queue[0]
+            if future.done():
+                # The waiter was cancelled
+                queue.popleft()
+                if not queue:
+                    del self._queues[session]
+                continue
+            wait = max(self._paused_until - time.monotonic(), self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait > 0:
+                self._schedule(wait)
+                return
+            queue.popleft()
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+            self.granted += 1
+            # The session goes to the back of the line
+            if queue:
+                self._queues.move_to_end(session)
+            else:
+                del self._queues[session]
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "granted": self.granted,
+            "rate_limited": self.rate_limited,
+            "mean_wait": self.total_wait / self.granted if self.granted else 0.0,
+        }
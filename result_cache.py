@@ -0,0 +1,136 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from text_utils import tokenize
+
+URL_RE = re.compile(r"https?://\S+|www\.\S+")
+# "RT @user:" prefixes and @mentions don't change what a tweet is about
+MENTION_RE = re.compile(r"\brt\s+@\w+:?|@\w+")
+
+FINGERPRINT_BITS = 64
+
+def normalize_tweet(text: str) -> str:
+    """Lowercase a tweet and reduce it to its content words, dropping links, mentions and punctuation."""
+    text = MENTION_RE.sub(" ", URL_RE.sub(" ", text.lower()))
+    return " ".join(tokenize(text))
+
+def simhash(normalized: str) -> int:
+    """64-bit SimHash of a normalized tweet over its words.
+
+    Texts that share most of their words get fingerprints that differ in only
+    a few bits, so the Hamming distance between fingerprints measures how
+    different two tweets are. Word pairs are left out on purpose: tweets are
+    short, and with pairs a single edited word already moves a fingerprint
+    further than a typical near-duplicate threshold.
+    """
+    weights = [0] * FINGERPRINT_BITS
+    for word in normalized.split():
+        value = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+class NearDuplicateCache:
+    """Thread-safe cache of pipeline results keyed by tweet, also matching near-identical tweets.
+
+    A lookup first tries the exact normalized text, then any cached tweet whose
+    SimHash is within max_distance bits. Candidates come from an LSH index:
+    the fingerprint is split into max_distance + 1 bands, and two fingerprints
+    within max_distance bits must agree on at least one whole band, so only
+    tweets sharing a band are compared. Entries expire after ttl seconds and
+    the least recently used are evicted beyond max_entries.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_distance: int = 6):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        edges = [FINGERPRINT_BITS * band // bands for band in range(bands + 1)]
+        self._bands = [(start, (1 << (end - start)) - 1) for start, end in zip(edges, edges[1:])]
+        # normalized text -> (fingerprint, value, created), least recently used first
+        self._entries = OrderedDict()
+        # one {band value: set of normalized texts} per band
+        self._index = [{} for _ in self._bands]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def _band_keys(self, fingerprint: int):
+        return [(fingerprint >> start) & mask for start, mask in self._bands]
+
+    def get(self, text: str):
+        """Return (value, distance) for the closest fresh cached tweet, or None.
+
+        distance is 0 for the same normalized text.
+        """
+        normalized = normalize_tweet(text)
+        if not normalized:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(normalized)
+            if entry is not None and now - entry[2] < self.ttl:
+                self._entries.move_to_end(normalized)
+                self.hits += 1
+                return entry[1], 0
+
+            fingerprint = simhash(normalized)
+            candidates = set()
+            for band, key in enumerate(self._band_keys(fingerprint)):
+                candidates.update(self._index[band].get(key, ()))
+            best = None
+            for candidate in candidates:
+                candidate_fingerprint, value, created = self._entries[candidate]
+                if now - created >= self.ttl:
+                    self._remove(candidate)
+                    continue
+                distance = bin(fingerprint ^ candidate_fingerprint).count("1")
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (candidate, distance, value)
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best[0])
+            self.hits += 1
+            self.near_hits += 1
+            return best[2], best[1]
+
+    def set(self, text: str, value):
+        normalized = normalize_tweet(text)
+        if not normalized:
+            return
+        fingerprint = simhash(normalized)
+        with self._lock:
+            if normalized in self._entries:
+                self._remove(normalized)
+            self._entries[normalized] = (fingerprint, value, time.monotonic())
+            for band, key in enumerate(self._band_keys(fingerprint)):
+                self._index[band].setdefault(key, set()).add(normalized)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, normalized: str):
+        # Caller holds the lock
+        fingerprint, _, _ = self._entries.pop(normalized)
+        for band, key in enumerate(self._band_keys(fingerprint)):
+            members = self._index[band].get(key)
+            if members is not None:
+                members.discard(normalized)
+                if not members:
+                    del self._index[band][key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight call.
+
+    While a call for a key is running, other callers asking for that key wait
+    for it and share its result (or exception) instead of issuing their own.
+    Nothing is kept once the call finishes; caching is left to the caller.
+
+    do() is for threads, do_async() for coroutines on the shared event loop.
+    Both return (result, shared), where shared is True for callers that
+    joined a call someone else started.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def _count(self, shared: bool):
+        with self._lock:
+            if shared:
+                self.coalesced += 1
+            else:
+                self.calls += 1
+
+    def do(self, key, fn) -> tuple:
+        """Run fn() once for all threads asking for key at the same time."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def do_async(self, key, fn) -> tuple:
+        """Await fn() once for all coroutines asking for key at the same time.
+
+        The call runs as its own task, so a caller that is cancelled (e.g. by
+        its deadline) doesn't cancel it for the others; it is only cancelled
+        once every caller waiting on it has gone.
+        """
+        entry = self._tasks.get(key)
+        shared = entry is not None
+        if entry is None:
+            task = asyncio.ensure_future(fn())
+            entry = self._tasks[key] = {"task": task, "waiters": 0}
+            task.add_done_callback(lambda _: self._tasks.pop(key, None) if self._tasks.get(key) is entry else None)
+        self._count(shared)
+
+        entry["waiters"] += 1
+        try:
+            return await asyncio.shield(entry["task"]), shared
+        except asyncio.CancelledError:
+            if entry["waiters"] == 1 and not entry["task"].done():
+                # Later callers must start a fresh call rather than join the cancelled one
+                if self._tasks.get(key) is entry:
+                    del self._tasks[key]
+                entry["task"].cancel()
+            raise
+        finally:
+            entry["waiters"] -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced}
@@ -0,0 +1,83 @@
+import threading
+from collections import Counter
+from text_utils import estimate_tokens
+
+class TagVocabulary:
+    """Incrementally maintained tag frequency index over the current trending templates.
+
+    Each update is the whole trending pool: templates are counted once per
+    tag, keyed by their ID, so re-adding the same template is a no-op, a
+    template whose tags changed only moves its own counts, and templates that
+    left the pool are dropped. Tags are compared case- and
+    whitespace-insensitively and shown in their most common spelling.
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._spellings = {}
+        # template ID -> {normalized tag: spelling}
+        self._template_tags = {}
+        self._lock = threading.Lock()
+
+    def update(self, templates: list) -> int:
+        """Replace the indexed pool with templates; returns how many templates changed the index."""
+        changed = 0
+        with self._lock:
+            current = {}
+            for template in templates:
+                tags = {}
+                for tag in template.tags:
+                    spelling = " ".join(tag.split())
+                    if spelling:
+                        tags.setdefault(spelling.lower(), spelling)
+                current[template.id] = tags
+            for template_id in set(self._template_tags) - set(current):
+                self._move(self._template_tags.pop(template_id), {})
+                changed += 1
+            for template_id, tags in current.items():
+                old_tags = self._template_tags.get(template_id, {})
+                if tags == old_tags:
+                    continue
+                self._move(old_tags, tags)
+                self._template_tags[template_id] = tags
+                changed += 1
+        return changed
+
+    def _move(self, old_tags: dict, new_tags: dict):
+        # Caller holds the lock; swaps one template's tags and spellings
+        for normalized, spelling in old_tags.items():
+            self._counts[normalized] -= 1
+            spellings = self._spellings[normalized]
+            spellings[spelling] -= 1
+            if spellings[spelling] <= 0:
+                del spellings[spelling]
+            if self._counts[normalized] <= 0:
+                del self._counts[normalized]
+                del self._spellings[normalized]
+        for normalized, spelling in new_tags.items():
+            self._counts[normalized] += 1
+            self._spellings.setdefault(normalized, Counter())[spelling] += 1
+
+    def top_tags(self, k: int, token_budget: int = None) -> list:
+        """Return up to k tags, most frequent first, that fit within token_budget.
+
+        Ties are broken alphabetically so the same index always gives the same list.
+        """
+        with self._lock:
+            ranked = sorted(self._counts.items(), key=lambda item: (-item[1], item[0]))
+            spellings = {tag: self._spellings[tag].most_common(1)[0][0] for tag, _ in ranked[:k]}
+        tags = []
+        used = 0
+        for normalized, _ in ranked[:k]:
+            tag = spellings[normalized]
+            # Each tag costs its own tokens plus a separator
+            cost = estimate_tokens(tag) + 1
+            if token_budget is not None and used + cost > token_budget:
+                break
+            tags.append(tag)
+            used += cost
+        return tags
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._counts)
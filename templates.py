@@ -0,0 +1,110 @@
+import sys
+import threading
+from collections import OrderedDict
+
+class Template:
+    """Compact record of a 3look template, holding only the fields the app uses.
+
+    Built once when an API payload is parsed, so the pipeline, caches and
+    session state never hold the full JSON. Tags are a tuple of interned
+    strings: a tag like "mood" is stored once no matter how many templates
+    (or sessions) carry it.
+    """
+
+    __slots__ = ("id", "name", "slug", "tags", "preview_url", "nft_count")
+
+    def __init__(self, id: str, name: str, slug: str, tags: tuple, preview_url: str, nft_count: int):
+        self.id = id
+        self.name = name
+        self.slug = slug
+        self.tags = tags
+        self.preview_url = preview_url
+        self.nft_count = nft_count
+
+    @classmethod
+    def from_api(cls, payload: dict) -> "Template":
+        """Build a record from a templates API payload."""
+        return cls(
+            id=payload["id"],
+            name=payload.get("name") or "",
+            slug=payload.get("slug") or "",
+            tags=tuple(sys.intern(tag) for tag in payload.get("tags") or () if isinstance(tag, str)),
+            preview_url=payload.get("previewUrl") or "",
+            nft_count=payload.get("amountOfNfts") or 0,
+        )
+
+    def to_dict(self) -> dict:
+        """Return the record with the API's field names, e.g. for JSON output."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "slug": self.slug,
+            "tags": list(self.tags),
+            "previewUrl": self.preview_url,
+            "amountOfNfts": self.nft_count,
+        }
+
+    def approx_size(self) -> int:
+        """Rough size in bytes of the record's own strings, for cache budgets (interned tags not counted)."""
+        return 64 + len(self.id) + len(self.name) + len(self.slug) + len(self.preview_url) + 8 * len(self.tags)
+
+    def _fields(self) -> tuple:
+        return (self.id, self.name, self.slug, self.tags, self.preview_url, self.nft_count)
+
+    def __repr__(self) -> str:
+        return f"Template(id={self.id!r}, name={self.name!r})"
+
+def parse_templates(payloads: list) -> list:
+    """Build records for a list of API payloads."""
+    return [Template.from_api(payload) for payload in payloads]
+
+class TemplateStore:
+    """Process-wide store of Template records keyed by ID, with LRU eviction.
+
+    Every session's results go through add(), which returns the stored
+    record when an identical one is already there, so the many sessions
+    showing the same trending templates share one copy. Sessions keep only
+    template IDs and resolve them when rendering; memory grows with the
+    number of distinct templates, capped at max_entries.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def add(self, templates) -> list:
+        """Store templates and return the canonical record for each, in order."""
+        canonical = []
+        with self._lock:
+            for template in templates:
+                stored = self._records.get(template.id)
+                if stored is not None and stored._fields() == template._fields():
+                    self._records.move_to_end(template.id)
+                    canonical.append(stored)
+                    continue
+                # New template, or its payload changed upstream
+                self._records[template.id] = template
+                self._records.move_to_end(template.id)
+                canonical.append(template)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+                self.evictions += 1
+        return canonical
+
+    def get(self, template_id: str):
+        """Return the record for an ID, or None if it was never stored or has been evicted."""
+        with self._lock:
+            template = self._records.get(template_id)
+            if template is not None:
+                self._records.move_to_end(template_id)
+            return template
+
+    def resolve(self, template_ids: list) -> list:
+        """Return the records for a list of IDs, in order, skipping evicted ones."""
+        return [template for template in map(self.get, template_ids) if template is not None]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"templates": len(self._records), "max_entries": self.max_entries, "evictions": self.evictions}
@@ -0,0 +1,20 @@
+from prompt_encoding import CandidateEncoder
+from templates import Template
+
+def make_encoder(count=5):
+    return CandidateEncoder([Template.from_api({"id": f"uuid-{i}", "name": f"gif {i}"}) for i in range(count)])
+
+def test_decode_maps_int_and_digit_string_aliases():
+    assert make_encoder().decode([1, "2", " 3 "]) == ["uuid-0", "uuid-1", "uuid-2"]
+
+def test_decode_skips_bools_floats_and_other_strings():
+    assert make_encoder().decode([True, 3.7, "x", "²", None, 2]) == ["uuid-1"]
+
+def test_decode_skips_unknown_and_repeated_aliases():
+    assert make_encoder().decode([0, 6, 1, 1, "1"]) == ["uuid-0"]
+
+def test_decode_maps_object_aliases_and_known_ids():
+    assert make_encoder().decode([{"id": 3}, {"id": "4"}, {"id": "uuid-4"}]) == ["uuid-2", "uuid-3", "uuid-4"]
+
+def test_decode_skips_unknown_object_ids():
+    assert make_encoder().decode([1, {"id": "hallucinated"}, {"id": True}, {"id": None}, {}]) == ["uuid-0"]
@@ -0,0 +1,17 @@
+import re
+
+WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Common English filler words that carry no signal for matching GIFs
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have i if in is it its me my of on or so
+that the this to was were will with you your just about what when how all
+""".split())
+
+def tokenize(text: str) -> list:
+    """Lowercase a string and split it into word tokens, dropping stopwords."""
+    return [token for token in WORD_RE.findall(text.lower()) if token not in STOPWORDS]
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of LLM tokens in a string (~4 characters per token)."""
+    return (len(text) + 3) // 4
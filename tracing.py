@@ -0,0 +1,227 @@
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# The span new spans attach to; asyncio tasks and to_thread calls inherit it
+_current_span = ContextVar("current_span", default=None)
+
+class Span:
+    """A timed operation with attributes and nested child spans."""
+
+    __slots__ = ("name", "attributes", "children", "start", "end")
+
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.children = []
+        self.start = time.perf_counter()
+        self.end = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+    def walk(self):
+        """Yield this span and every descendant, depth first."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "duration": round(self.duration, 6),
+            "attributes": self.attributes,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+class LatencyHistograms:
+    """Per-span-name latency histograms aggregated across every trace in the process.
+
+    Keeps Prometheus-style cumulative buckets plus a bounded window of recent
+    samples for p50/p95/p99.
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = {
+                    "buckets": [0] * len(self.BUCKETS),
+                    "count": 0,
+                    "sum": 0.0,
+                    "recent": deque(maxlen=self.window),
+                }
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    series["buckets"][i] += 1
+            series["count"] += 1
+            series["sum"] += seconds
+            series["recent"].append(seconds)
+
+    @staticmethod
+    def _quantile(ordered: list, q: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def snapshot(self) -> dict:
+        """Return count, sum and p50/p95/p99 for every span name."""
+        with self._lock:
+            result = {}
+            for name, series in sorted(self._series.items()):
+                ordered = sorted(series["recent"])
+                result[name] = {
+                    "count": series["count"],
+                    "sum": series["sum"],
+                    "p50": self._quantile(ordered, 0.50),
+                    "p95": self._quantile(ordered, 0.95),
+                    "p99": self._quantile(ordered, 0.99),
+                }
+            return result
+
+    def render_prometheus(self) -> str:
+        """Render every series in the Prometheus text exposition format."""
+        lines = [
+            "# HELP gif_span_duration_seconds Duration of traced pipeline spans.",
+            "# TYPE gif_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            series_items = sorted((name, dict(series, buckets=list(series["buckets"])))
+                                  for name, series in self._series.items())
+        for name, series in series_items:
+            for bound, count in zip(self.BUCKETS, series["buckets"]):
+                lines.append(f'gif_span_duration_seconds_bucket{{span="{name}",le="{bound:g}"}} {count}')
+            lines.append(f'gif_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {series["count"]}')
+            lines.append(f'gif_span_duration_seconds_sum{{span="{name}"}} {series["sum"]:.6f}')
+            lines.append(f'gif_span_duration_seconds_count{{span="{name}"}} {series["count"]}')
+        lines.append("# HELP gif_span_duration_quantile_seconds Recent span duration quantiles.")
+        lines.append("# TYPE gif_span_duration_quantile_seconds gauge")
+        for name, stats in self.snapshot().items():
+            for label in ("p50", "p95", "p99"):
+                quantile = int(label[1:]) / 100
+                lines.append(f'gif_span_duration_quantile_seconds{{span="{name}",quantile="{quantile:g}"}} {stats[label]:.6f}')
+        return "\n".join(lines) + "\n"
+
+class Tracer:
+    """Collects finished traces into histograms and an optional JSON lines file."""
+
+    def __init__(self, jsonl_path: str = None):
+        self.histograms = LatencyHistograms()
+        self.jsonl_path = jsonl_path
+        self._file_lock = threading.Lock()
+
+    def record(self, root: Span):
+        for item in root.walk():
+            self.histograms.observe(item.name, item.duration)
+        if self.jsonl_path:
+            line = json.dumps({"timestamp": time.time(), "trace": root.to_dict()}, default=str)
+            with self._file_lock, open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+# Process-wide tracer; ai_utils sets jsonl_path from TRACE_JSONL_PATH
+tracer = Tracer()
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block as a span nested under the current one.
+
+    A span opened with no current span is a trace root; when it finishes, its
+    whole tree is recorded by the process-wide tracer.
+    """
+    parent = _current_span.get()
+    current = Span(name, attributes)
+    if parent is not None:
+        parent.children.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+        if parent is None:
+            tracer.record(current)
+
+def traced(name: str):
+    """Decorator that runs a function (sync or async) inside a span of the given name."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def current_span():
+    """Return the innermost open span, or None outside any trace."""
+    return _current_span.get()
+
+def render_span_tree(root: Span, indent: int = 0) -> str:
+    """Render a span tree as indented "name: seconds (attributes)" lines."""
+    attributes = ", ".join(f"{key}={value}" for key, value in root.attributes.items())
+    line = "  " * indent + f"{root.name}: {root.duration:.2f}s"
+    if attributes:
+        line += f" ({attributes})"
+    return "\n".join([line] + [render_span_tree(child, indent + 1) for child in root.children])
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = tracer.histograms.render_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body = json.dumps(tracer.histograms.snapshot()).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_metrics_server = None
+_metrics_lock = threading.Lock()
+
+def start_metrics_server(port: int, host: str = "127.0.0.1"):
+    """Serve /metrics (Prometheus text) and /metrics.json on a background thread, once per process.
+
+    Binds to localhost unless another host is given.
+    """
+    global _metrics_server
+    with _metrics_lock:
+        if _metrics_server is not None:
+            return
+        _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=_metrics_server.serve_forever, daemon=True, name="metrics-server").start()